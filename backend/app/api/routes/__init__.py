@@ -2,7 +2,11 @@ from fastapi import APIRouter
 
 from app.api.routes.solicitacao import router as solicitacao_router
 from app.api.routes.admin import router as admin_router
+from app.api.routes.mapa import router as mapa_router
+from app.api.routes.estatisticas import router as estatisticas_router
 
 router = APIRouter()
 router.include_router(solicitacao_router, prefix="/solicitacoes", tags=["solicitacoes"])
+router.include_router(mapa_router, prefix="/mapa", tags=["mapa"])
+router.include_router(estatisticas_router, prefix="/estatisticas", tags=["estatisticas"])
 router.include_router(admin_router, prefix="/admin", tags=["admin"])
@@ -1,19 +1,47 @@
-from fastapi import APIRouter, Response, status
-from app.core.cache import clear_cache_pattern
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.core.cache import cache_stats, clear_cache_pattern
+from app.core.config import settings
+from app.core.database import get_pool_status
 
 router = APIRouter()
 
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Diagnósticos só ficam disponíveis com ADMIN_TOKEN configurado e informado em X-Admin-Token"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de administração inválido")
+
+
 @router.post("/clear-cache", status_code=status.HTTP_200_OK)
 async def clear_cache():
     """
     Limpar todo o cache (apenas para administração)
     """
     try:
-        clear_cache_pattern("*")
+        await clear_cache_pattern("*")
         return {"message": "Cache limpo com sucesso"}
     except Exception as e:
         return {"error": f"Erro ao limpar cache: {str(e)}"}
 
+@router.get("/cache", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_token)])
+async def cache():
+    """
+    Contadores de acertos, falhas e remoções dos caches em memória
+    """
+    return cache_stats()
+
+@router.get("/pool", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin_token)])
+async def pool():
+    """
+    Estatísticas do pool de conexões do banco (conexões em uso, overflow e tempo de espera)
+    """
+    return get_pool_status()
+
 @router.get("/health", status_code=status.HTTP_200_OK)
 async def health():
     """
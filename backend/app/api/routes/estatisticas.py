@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routes.solicitacao import _to_utc_naive
+from app.core.database import get_db
+from app.schemas.solicitacao import Estatisticas, TempoEmStatusList
+from app.services.estatistica_service import EstatisticaService
+
+router = APIRouter()
+
+
+@router.get("", response_model=Estatisticas)
+async def get_estatisticas(db: AsyncSession = Depends(get_db)):
+    """
+    Totais por status, categoria e bairro e tempo médio de resolução para o painel.
+
+    Os números vêm de agregados mantidos a cada criação/atualização, sem varrer as solicitações.
+    """
+    return await EstatisticaService.get_estatisticas(db)
+
+@router.get("/tempo-em-status", response_model=TempoEmStatusList)
+async def get_tempo_em_status(
+    desde: Optional[datetime] = Query(None, description="Só períodos encerrados a partir desta data, em UTC"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Percentis (p50, p90, p99) de quanto tempo as solicitações ficam em cada status, por categoria e bairro.
+
+    Calculados a partir do histórico de transições de status; só contam períodos já encerrados.
+    """
+    return await EstatisticaService.get_tempo_em_status(db, _to_utc_naive(desde))
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routes.solicitacao import get_filtros
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.geo import BoundingBox
+from app.schemas.solicitacao import ClusterList, SolicitacaoArea, SolicitacaoFiltros, SolicitacaoProximaList
+from app.services.cluster_service import ClusterService
+from app.services.mapa_service import MapaService
+
+router = APIRouter()
+
+
+@router.get("/proximas", response_model=SolicitacaoProximaList)
+async def list_proximas(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    raio: float = Query(1000, gt=0, le=settings.GEO_MAX_RADIUS_M, description="Raio em metros"),
+    limit: int = Query(100, ge=1, le=500, description="Limite de itens para retornar"),
+    filtros: SolicitacaoFiltros = Depends(get_filtros),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Listar as solicitações a até `raio` metros do ponto, da mais próxima para a mais distante.
+    """
+    return await MapaService.list_proximas(db, latitude, longitude, raio, limit, filtros)
+
+def get_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+) -> BoundingBox:
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="Retângulo inválido: mínimos maiores que máximos")
+    return BoundingBox(min_lat, min_lon, max_lat, max_lon)
+
+@router.get("/area", response_model=SolicitacaoArea)
+async def list_area(
+    bbox: BoundingBox = Depends(get_bbox),
+    limit: int = Query(500, ge=1, le=2000, description="Limite de itens para retornar"),
+    filtros: SolicitacaoFiltros = Depends(get_filtros),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Listar as solicitações dentro do retângulo visível do mapa, das mais recentes para as mais antigas.
+    """
+    return await MapaService.list_area(db, bbox, limit, filtros)
+
+@router.get("/clusters", response_model=ClusterList)
+async def list_clusters(
+    bbox: BoundingBox = Depends(get_bbox),
+    zoom: int = Query(..., ge=0, le=22, description="Nível de zoom do mapa"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Agrupar as solicitações do retângulo em clusters (contagem, centroide e status) para o zoom informado.
+
+    Cada tile do mapa é calculado com GROUP BY no banco e guardado em cache separadamente.
+    """
+    return await ClusterService.list_clusters(db, bbox, zoom)
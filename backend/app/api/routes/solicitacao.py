@@ -1,17 +1,63 @@
-from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.solicitacao import SolicitacaoCreate, SolicitacaoResponse, SolicitacaoUpdate, SolicitacaoList
-from app.services.solicitacao_service import SolicitacaoService
+from app.core.etag import StaleVersionError, conditional_response, parse_if_match, version_etag
+from app.core.pagination import InvalidCursorError
+from app.models.solicitacao import StatusEnum
+from app.schemas.solicitacao import (
+    ExportFormato,
+    SolicitacaoBulkResultado,
+    SolicitacaoBulkStatusUpdate,
+    SolicitacaoBuscaList,
+    SolicitacaoCreate,
+    SolicitacaoFiltros,
+    SolicitacaoHistoricoItem,
+    SolicitacaoList,
+    SolicitacaoParcialList,
+    SolicitacaoResponse,
+    SolicitacaoUpdate,
+    ListaVisao,
+    TotalModo,
+)
+from app.services.solicitacao_service import RESUMO_FIELDS, InvalidFieldsError, SolicitacaoService, parse_fields
 
 router = APIRouter()
 
+
+def _to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # criado_em é gravado em UTC sem fuso (datetime.utcnow)
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def get_filtros(
+    status: Optional[StatusEnum] = Query(None, description="Filtrar por status"),
+    categoria: Optional[str] = Query(None, description="Filtrar por categoria"),
+    bairro: Optional[str] = Query(None, description="Filtrar por bairro"),
+    criado_de: Optional[datetime] = Query(None, description="Criadas a partir desta data (inclusive)"),
+    criado_ate: Optional[datetime] = Query(None, description="Criadas antes desta data (exclusive)"),
+    com_fotos: Optional[bool] = Query(None, description="true: só solicitações com fotos; false: só sem fotos"),
+) -> SolicitacaoFiltros:
+    return SolicitacaoFiltros(
+        status=status,
+        categoria=categoria,
+        bairro=bairro,
+        criado_de=_to_utc_naive(criado_de),
+        criado_ate=_to_utc_naive(criado_ate),
+        com_fotos=com_fotos,
+    )
+
+
 @router.post("/", response_model=SolicitacaoResponse, status_code=201)
 async def create_solicitacao(
     solicitacao: SolicitacaoCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Criar uma nova solicitação de serviço.
@@ -19,41 +65,169 @@ async def create_solicitacao(
     result = await SolicitacaoService.create_solicitacao(db, solicitacao)
     return result
 
-@router.get("/", response_model=SolicitacaoList)
+@router.get("/", response_model=Union[SolicitacaoList, SolicitacaoParcialList])
 async def list_solicitacoes(
+    request: Request,
     skip: int = Query(0, ge=0, description="Items para pular"),
     limit: int = Query(100, ge=1, le=100, description="Limite de itens para retornar"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em next_cursor; quando informado, skip é ignorado"),
+    filtros: SolicitacaoFiltros = Depends(get_filtros),
+    total_modo: TotalModo = Query(
+        TotalModo.EXACT,
+        alias="total",
+        description="exact: contagem exata; estimate: estimativa do planejador (PostgreSQL); none: não calcula o total",
+    ),
+    visao: ListaVisao = Query(
+        ListaVisao.COMPLETA,
+        description=f"completa: todos os campos; resumo: só {', '.join(RESUMO_FIELDS)}",
+    ),
+    fields: Optional[str] = Query(
+        None, description="Campos separados por vírgula (ex.: id,titulo,status); tem precedência sobre visao"
+    ),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Listar todas as solicitações com paginação.
+    Listar as solicitações com filtros opcionais e paginação por offset ou por cursor.
+
+    Com visao=resumo ou fields=, só as colunas pedidas são lidas do banco e devolvidas.
+    A resposta traz um ETag; com If-None-Match igual, a resposta é 304 sem corpo.
     """
-    result = await SolicitacaoService.list_solicitacoes(db, skip, limit)
-    return result
+    try:
+        if fields is not None or visao == ListaVisao.RESUMO:
+            campos = parse_fields(fields) if fields is not None else RESUMO_FIELDS
+            result = await SolicitacaoService.list_solicitacoes_campos(
+                db, campos=campos, skip=skip, limit=limit, cursor=cursor, filtros=filtros, total_modo=total_modo
+            )
+        else:
+            result = await SolicitacaoService.list_solicitacoes(
+                db, skip=skip, limit=limit, cursor=cursor, filtros=filtros, total_modo=total_modo
+            )
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_response(request, result, settings.CACHE_CONTROL_LISTAGEM)
+
+@router.get("/busca", response_model=SolicitacaoBuscaList)
+async def search_solicitacoes(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200, description="Termos buscados no título e na descrição"),
+    limit: int = Query(20, ge=1, le=100, description="Limite de itens para retornar"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em next_cursor"),
+    filtros: SolicitacaoFiltros = Depends(get_filtros),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Buscar solicitações pelo texto do título e da descrição, das mais relevantes para as menos relevantes.
+    """
+    try:
+        result = await SolicitacaoService.search_solicitacoes(db, q, limit=limit, cursor=cursor, filtros=filtros)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_response(request, result, settings.CACHE_CONTROL_LISTAGEM)
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormato.NDJSON: "application/x-ndjson",
+    ExportFormato.CSV: "text/csv",
+}
+
+@router.get("/export")
+async def export_solicitacoes(
+    formato: ExportFormato = Query(ExportFormato.NDJSON, description="ndjson (uma solicitação por linha) ou csv"),
+    filtros: SolicitacaoFiltros = Depends(get_filtros),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exportar todas as solicitações que atendem aos filtros, sem paginação.
+
+    O arquivo é gerado aos poucos a partir de um cursor no banco, com memória constante.
+    """
+    return StreamingResponse(
+        SolicitacaoService.export_solicitacoes(db, formato, filtros),
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="solicitacoes.{formato.value}"'},
+    )
+
+def _check_bulk_size(quantidade: int) -> None:
+    if quantidade > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {quantidade} itens excede o máximo de {settings.BULK_MAX_ITEMS}",
+        )
+
+@router.post("/bulk", response_model=SolicitacaoBulkResultado, status_code=201)
+async def bulk_create_solicitacoes(
+    itens: List[Dict[str, Any]] = Body(..., description="Solicitações a criar, no formato de SolicitacaoCreate"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Criar várias solicitações em uma única transação.
+
+    Itens inválidos não impedem a criação dos demais; são devolvidos em `erros` com a posição no lote.
+    """
+    _check_bulk_size(len(itens))
+    return await SolicitacaoService.bulk_create_solicitacoes(db, itens)
+
+@router.patch("/bulk-status", response_model=SolicitacaoBulkResultado)
+async def bulk_update_status(
+    update: SolicitacaoBulkStatusUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Atualizar o status de várias solicitações de uma vez; ids inexistentes são devolvidos em `erros`.
+    """
+    _check_bulk_size(len(update.ids))
+    return await SolicitacaoService.bulk_update_status(db, update)
 
 @router.get("/{solicitacao_id}", response_model=SolicitacaoResponse)
 async def get_solicitacao(
     solicitacao_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obter detalhes de uma solicitação específica.
+
+    O ETag é a versão da solicitação (o mesmo valor aceito no If-Match do PATCH) e o Last-Modified é
+    atualizado_em; com If-None-Match ou If-Modified-Since atuais, a resposta é 304 sem corpo.
     """
     result = await SolicitacaoService.get_solicitacao(db, solicitacao_id)
     if not result:
         raise HTTPException(status_code=404, detail="Solicitação não encontrada")
+    return conditional_response(request, result, settings.CACHE_CONTROL_SOLICITACAO)
+
+@router.get("/{solicitacao_id}/historico", response_model=List[SolicitacaoHistoricoItem])
+async def get_historico(
+    solicitacao_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Transições de status da solicitação, da mais antiga para a mais recente.
+    """
+    result = await SolicitacaoService.get_historico(db, solicitacao_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Solicitação não encontrada")
     return result
 
 @router.patch("/{solicitacao_id}", response_model=SolicitacaoResponse)
 async def update_solicitacao_status(
     solicitacao_id: int,
     update: SolicitacaoUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None, description='Versão esperada, como devolvida no ETag (ex.: "3")'),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualizar o status de uma solicitação.
+
+    Com If-Match, a alteração só é aplicada se a solicitação ainda estiver na versão informada; caso
+    contrário a resposta é 412 e o cliente deve recarregá-la antes de tentar de novo.
     """
-    result = await SolicitacaoService.update_solicitacao_status(db, solicitacao_id, update)
+    try:
+        result = await SolicitacaoService.update_solicitacao_status(
+            db, solicitacao_id, update, parse_if_match(if_match)
+        )
+    except StaleVersionError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Solicitação não encontrada")
+    response.headers["ETag"] = version_etag(result["versao"])
     return result
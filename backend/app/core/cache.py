@@ -1,114 +1,628 @@
+import asyncio
+import hashlib
+import inspect
 import json
-import redis
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from enum import Enum
 from functools import wraps
-from typing import Any, Callable, Dict, List, Type, TypeVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence, Tuple, Type, TypeVar
 
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from sqlalchemy.orm import Session
+
+from .compression import available_encodings, choose_encoding, encoding_etag, precompress
 from .config import settings
 
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
 
-redis_client = None
-fake_cache = {}
+logger = logging.getLogger(__name__)
 
-try:
-    if settings.REDIS_CACHE_ENABLED:
-        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
 
-        redis_client.ping()
-        print("Conexão com Redis estabelecida com sucesso.")
-except Exception as e:
-    print(f"Erro ao conectar ao Redis: {e}")
-    print("Usando cache local em memória como fallback.")
-    redis_client = None
+class LRUCache:
+    """Cache em memória limitado por quantidade de itens (LRU), com expiração por item"""
 
-def serialize_json(obj: Any) -> str:
-    """Serializa objeto Python para JSON string"""
-    return json.dumps(obj, default=str)
+    def __init__(self, maxsize: int, ttl: int = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
 
-def deserialize_json(json_str: str) -> Any:
-    """Deserializa JSON string para objeto Python"""
-    return json.loads(json_str)
+    def __len__(self) -> int:
+        return len(self._data)
 
-def get_cache(key: str) -> Any:
-    """Obtém um item do cache"""
-    if redis_client:
+    def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl and ttl > 0 else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+redis_pool: Optional["aioredis.BlockingConnectionPool"] = None
+redis_client: Optional["aioredis.Redis"] = None
+# Depois de uma falha de conexão, próxima tentativa (time.monotonic()); até lá usa o cache local
+_redis_retry_at = 0.0
+_redis_connecting: Optional["asyncio.Future[None]"] = None
+
+# Fallback quando o Redis está indisponível
+local_cache = LRUCache(maxsize=settings.LOCAL_CACHE_MAXSIZE, ttl=settings.REDIS_CACHE_EXPIRE)
+
+# Camada L1 opcional, por processo, na frente do Redis (apenas para funções com cached(l1=True)).
+# O TTL curto limita por quanto tempo outro worker pode servir um valor já invalidado.
+l1_cache: Optional[LRUCache] = None
+if settings.CACHE_L1_ENABLED:
+    l1_cache = LRUCache(maxsize=settings.CACHE_L1_MAXSIZE, ttl=settings.CACHE_L1_TTL)
+
+
+async def get_redis() -> Optional["aioredis.Redis"]:
+    """
+    Cliente do Redis deste processo, conectado no primeiro uso; None enquanto indisponível (cache local).
+
+    O worker sobe sem esperar pelo Redis: a primeira operação de cache cria o pool e verifica a conexão,
+    e chamadas concorrentes aguardam essa mesma tentativa. Após uma falha, nova tentativa só depois de
+    REDIS_RETRY_INTERVAL segundos.
+    """
+    global _redis_connecting
+    if redis_client is not None or not settings.REDIS_CACHE_ENABLED or time.monotonic() < _redis_retry_at:
+        return redis_client
+    if _redis_connecting is None:
+        _redis_connecting = asyncio.ensure_future(_connect_redis())
+        _redis_connecting.add_done_callback(_clear_redis_connecting)
+    await asyncio.shield(_redis_connecting)
+    return redis_client
+
+
+def _clear_redis_connecting(_: Any) -> None:
+    global _redis_connecting
+    _redis_connecting = None
+
+
+async def _connect_redis() -> None:
+    global redis_pool, redis_client, _redis_retry_at
+    import redis.asyncio as aioredis
+
+    # Pool explícito: em rajadas a requisição espera até REDIS_POOL_TIMEOUT por uma conexão livre
+    # em vez de abrir conexões sem limite; cada comando tem seu próprio timeout de socket.
+    pool = aioredis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+    )
+    client = aioredis.Redis(connection_pool=pool)
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning("Erro ao conectar ao Redis (%s); usando cache local em memória como fallback", e)
+        _redis_retry_at = time.monotonic() + settings.REDIS_RETRY_INTERVAL
+        await pool.disconnect()
+        return
+    redis_pool, redis_client = pool, client
+    logger.info("Conexão com Redis estabelecida com sucesso.")
+
+
+async def close_cache() -> None:
+    """Aguarda as revalidações em segundo plano (até SHUTDOWN_DRAIN_TIMEOUT) e fecha o pool do Redis"""
+    global redis_pool, redis_client
+    if _background_tasks:
+        _, pendentes = await asyncio.wait(list(_background_tasks), timeout=settings.SHUTDOWN_DRAIN_TIMEOUT)
+        for task in pendentes:
+            task.cancel()
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+    redis_pool = redis_client = None
+
+def _serialize_default(obj: Any) -> Any:
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+def _json_serializer() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    return lambda obj: json.dumps(obj, default=_serialize_default).encode(), json.loads
+
+def _orjson_serializer() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    import orjson
+    # orjson já serializa datetime, enum e dataclasses nativamente
+    return lambda obj: orjson.dumps(obj, default=_serialize_default), orjson.loads
+
+def _msgpack_serializer() -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    import msgpack
+    return (
+        lambda obj: msgpack.packb(obj, default=_serialize_default, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False),
+    )
+
+SERIALIZERS: Dict[str, Callable[[], Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]] = {
+    "json": _json_serializer,
+    "orjson": _orjson_serializer,
+    "msgpack": _msgpack_serializer,
+}
+
+def load_serializer(name: str) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    """Par (dumps, loads) do serializador configurado; sem a biblioteca instalada, usa json"""
+    try:
+        return SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Serializador de cache desconhecido: {name}")
+    except ImportError as e:
+        logger.warning("Serializador %s indisponível (%s), usando json.", name, e)
+        return _json_serializer()
+
+_dumps, _loads = load_serializer(settings.CACHE_SERIALIZER)
+
+def serialize(obj: Any) -> bytes:
+    """Serializa objeto Python para bytes com o serializador configurado (CACHE_SERIALIZER)"""
+    return _dumps(obj)
+
+def deserialize(raw: bytes) -> Any:
+    """Deserializa bytes gravados por serialize"""
+    return _loads(raw)
+
+async def get_raw(key: str, l1: bool = False) -> Optional[bytes]:
+    """Obtém os bytes gravados em uma chave, sem deserializar"""
+    client = await get_redis()
+    if client:
+        if l1 and l1_cache is not None:
+            cached = l1_cache.get(key)
+            if cached is not None:
+                return cached
         try:
-            cached = redis_client.get(key)
-            return deserialize_json(cached) if cached else None
-        except:
+            cached = await client.get(key)
+        except Exception as e:
+            logger.warning("Erro ao obter cache: %s", e)
             return None
-    else:
-        return fake_cache.get(key)
+        if cached and l1 and l1_cache is not None:
+            l1_cache.set(key, cached)
+        return cached or None
+    return local_cache.get(key)
 
-def set_cache(key: str, value: Any, expire: int = None) -> None:
-    """Define um item no cache com tempo de expiração opcional"""
-    serialized = serialize_json(value)
-    
-    if redis_client:
+async def set_raw(key: str, raw: bytes, expire: int = None, l1: bool = False) -> None:
+    """Grava bytes já serializados com tempo de expiração opcional"""
+    if expire is None:
+        expire = settings.REDIS_CACHE_EXPIRE
+
+    client = await get_redis()
+    if client:
         try:
-            redis_client.set(key, serialized)
-            if expire is None:
-                expire = settings.REDIS_CACHE_EXPIRE
-            if expire > 0:
-                redis_client.expire(key, expire)
+            await client.set(key, raw, ex=expire if expire > 0 else None)
         except Exception as e:
-            print(f"Erro ao definir cache: {e}")
+            logger.warning("Erro ao definir cache: %s", e)
+        if l1 and l1_cache is not None:
+            l1_cache.set(key, raw, min(expire, l1_cache.ttl) if expire > 0 else None)
     else:
-        fake_cache[key] = serialized
+        local_cache.set(key, raw, expire)
+
+async def get_cache(key: str, l1: bool = False) -> Any:
+    """Obtém um item do cache"""
+    raw = await get_raw(key, l1=l1)
+    if raw is None:
+        return None
+    try:
+        return deserialize(raw)
+    except ValueError as e:
+        # Entrada gravada com outro serializador (ex.: troca de CACHE_SERIALIZER): trata como ausente
+        logger.warning("Erro ao deserializar cache %s: %s", key, e)
+        return None
+
+async def set_cache(key: str, value: Any, expire: int = None, l1: bool = False) -> None:
+    """Define um item no cache com tempo de expiração opcional"""
+    await set_raw(key, serialize(value), expire, l1=l1)
 
-def delete_cache(key: str) -> None:
-    """Remove um item do cache"""
-    if redis_client:
+async def delete_cache(*keys: str) -> None:
+    """Remove um ou mais itens do cache (um único DEL no Redis)"""
+    if not keys:
+        return
+    client = await get_redis()
+    for key in keys:
+        if l1_cache is not None:
+            l1_cache.delete(key)
+        if not client:
+            local_cache.delete(key)
+    if client:
         try:
-            redis_client.delete(key)
+            await client.delete(*keys)
         except Exception as e:
-            print(f"Erro ao deletar cache: {e}")
-    else:
-        if key in fake_cache:
-            del fake_cache[key]
+            logger.warning("Erro ao deletar cache: %s", e)
 
-def clear_cache_pattern(pattern: str) -> None:
+async def clear_cache_pattern(pattern: str) -> None:
     """Limpa todas as chaves que correspondam ao padrão"""
-    if redis_client:
+    if l1_cache is not None:
+        l1_cache.delete_prefix(pattern.replace("*", ""))
+    client = await get_redis()
+    if client:
         try:
             cursor = 0
             while True:
-                cursor, keys = redis_client.scan(cursor, match=pattern, count=100)
+                cursor, keys = await client.scan(cursor, match=pattern, count=100)
                 if keys:
-                    redis_client.delete(*keys)
+                    await client.delete(*keys)
                 if cursor == 0:
                     break
         except Exception as e:
-            print(f"Erro ao limpar cache com padrão {pattern}: {e}")
+            logger.warning("Erro ao limpar cache com padrão %s: %s", pattern, e)
     else:
-        for key in list(fake_cache.keys()):
-            if key.startswith(pattern.replace("*", "")):
-                del fake_cache[key]
+        local_cache.delete_prefix(pattern.replace("*", ""))
+
+
+VERSION_KEY_PREFIX = "cache:version"
+local_versions: Dict[str, int] = {}
+
+async def get_namespace_version(namespace: str) -> int:
+    """Geração atual de um namespace de cache; entradas de gerações anteriores deixam de ser lidas"""
+    client = await get_redis()
+    if client:
+        key = f"{VERSION_KEY_PREFIX}:{namespace}"
+        try:
+            version = await client.get(key)
+            if version is None:
+                # Se a chave de versão sumir (eviction/flush), recomeça de um valor que não
+                # colide com gerações antigas que ainda possam estar no Redis.
+                await client.set(key, time.time_ns(), nx=True)
+                version = await client.get(key)
+            return int(version)
+        except Exception as e:
+            logger.warning("Erro ao obter versão do namespace %s: %s", namespace, e)
+            return 0
+    return local_versions.setdefault(namespace, time.time_ns())
+
+async def invalidate_namespace(namespace: str) -> None:
+    """Invalida todas as entradas de um namespace em O(1); as antigas expiram pelo TTL"""
+    client = await get_redis()
+    if client:
+        try:
+            await client.incr(f"{VERSION_KEY_PREFIX}:{namespace}")
+        except Exception as e:
+            logger.warning("Erro ao invalidar namespace %s: %s", namespace, e)
+    else:
+        local_versions[namespace] = local_versions.get(namespace, time.time_ns()) + 1
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Contadores das camadas de cache em memória do processo"""
+    return {
+        "backend": "redis" if redis_client else "memory",
+        "local": local_cache.stats(),
+        "l1": l1_cache.stats() if l1_cache is not None else None,
+    }
+
+
+# Parâmetros com estes tipos (sessões injetadas via Depends) nunca entram na chave
+DEPENDENCY_TYPES: Tuple[type, ...] = (AsyncSession, Session)
+CACHE_KEY_MAX_LENGTH = 200
+
+
+def _normalize_key_value(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return _normalize_key_value(value.model_dump(exclude_none=True))
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _normalize_key_value(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalize_key_value(v) for v in value]
+        return sorted(items, key=repr) if isinstance(value, (set, frozenset)) else items
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def build_cache_key(key_prefix: str, name: str, params: Dict[str, Any], version: Optional[int] = None) -> str:
+    """
+    Monta uma chave estável a partir de parâmetros explícitos.
+
+    Os valores são normalizados (modelos Pydantic, enums, datas, dicts ordenados, None omitido) e
+    serializados de forma canônica; chaves maiores que CACHE_KEY_MAX_LENGTH usam o hash dos parâmetros.
+    """
+    key = f"{key_prefix}:{name}"
+    if version is not None:
+        key += f":v{version}"
+    encoded = json.dumps(
+        _normalize_key_value(params), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    if len(key) + len(encoded) + 1 > CACHE_KEY_MAX_LENGTH:
+        encoded = "h" + hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+    return f"{key}:{encoded}"
+
+
+# Cálculos em andamento por chave (single-flight) e tarefas de revalidação em segundo plano
+_inflight: Dict[str, "asyncio.Future[Any]"] = {}
+_background_tasks: set = set()
+
+
+def _fresh_dependency(value: Any) -> Any:
+    """Nova sessão no mesmo engine: a da requisição original já foi fechada quando a revalidação roda"""
+    if isinstance(value, DEPENDENCY_TYPES):
+        return type(value)(bind=value.bind)
+    return value
+
+
+async def _single_flight(key: str, compute: Callable[[], Any]) -> Any:
+    """Executa `compute` uma única vez por chave; chamadas concorrentes aguardam o mesmo resultado"""
+    while True:
+        future = _inflight.get(key)
+        if future is None:
+            break
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Quem calculava foi cancelado (ex.: cliente desconectou); tenta de novo
+            if not future.cancelled():
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    try:
+        result = await compute()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
+
+class CachedResponse(Response):
+    """
+    Resposta com o corpo JSON já codificado; o FastAPI a devolve sem validar de novo com o response_model.
+
+    Com `variants` (corpo já comprimido por codificação), envia a versão aceita pelo Accept-Encoding
+    sem comprimir de novo; o CompressionMiddleware deixa passar respostas com Content-Encoding.
+    """
+    media_type = "application/json"
+
+    def __init__(self, content: Any = None, *args, variants: Optional[Dict[str, bytes]] = None, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self.variants = variants or {}
+        self._negotiated = False
+
+    def negotiate(self, headers: Headers) -> None:
+        """
+        Escolhe, uma única vez, a variante aceita pelo Accept-Encoding: troca o corpo e ajusta Content-Encoding,
+        Content-Length, ETag (com o sufixo da codificação) e Vary. conditional_response chama antes de
+        decidir pelo 304, que assim leva os mesmos validadores da resposta completa.
+        """
+        if self._negotiated or not self.variants or "content-encoding" in self.headers:
+            return
+        self._negotiated = True
+        encoding = choose_encoding(
+            headers.get("accept-encoding", ""),
+            [name for name in available_encodings() if name in self.variants],
+        )
+        if encoding is not None:
+            self.body = self.variants[encoding]
+            self.headers["Content-Encoding"] = encoding
+            self.headers["Content-Length"] = str(len(self.body))
+            if "etag" in self.headers:
+                self.headers["ETag"] = encoding_etag(self.headers["etag"], encoding)
+        self.headers.add_vary_header("Accept-Encoding")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.negotiate(Headers(scope=scope))
+        await super().__call__(scope, receive, send)
+
+
+def content_etag(body: bytes) -> str:
+    """ETag forte a partir do conteúdo do corpo"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def http_date(value: datetime) -> str:
+    """Data no formato do Last-Modified; datetimes sem fuso são tratados como UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def pack_response(meta: Dict[str, Any], body: bytes, variants: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Entrada de resposta: uma linha de metadados em JSON seguida do corpo já codificado.
+
+    As versões comprimidas vêm logo após o corpo; a linha de metadados guarda o tamanho de cada parte.
+    """
+    if variants:
+        meta = {**meta, "n": len(body), "z": [[name, len(data)] for name, data in variants.items()]}
+        body = body + b"".join(variants.values())
+    return json.dumps(meta, separators=(",", ":")).encode() + b"\n" + body
+
+
+def unpack_response(raw: bytes) -> Tuple[Dict[str, Any], bytes, Dict[str, bytes]]:
+    """Metadados, corpo e versões comprimidas (vazio em entradas sem elas)"""
+    meta, _, rest = raw.partition(b"\n")
+    meta = json.loads(meta)
+    if "z" not in meta:
+        return meta, rest, {}
+    offset = meta["n"]
+    variants = {}
+    for name, size in meta["z"]:
+        variants[name] = rest[offset:offset + size]
+        offset += size
+    return meta, rest[:meta["n"]], variants
 
 
 F = TypeVar('F', bound=Callable[..., Any])
 
-def cached(expire: int = None, key_prefix: str = "cache"):
-    """Decorator para cache de funções"""
+def cached(
+    expire: int = None,
+    key_prefix: str = "cache",
+    l1: bool = False,
+    namespace: Optional[str] = None,
+    key_params: Optional[Sequence[str]] = None,
+    stale_while_revalidate: int = 0,
+    response_model: Optional[Type[BaseModel]] = None,
+    etag: Optional[Callable[[Any], str]] = None,
+    last_modified: Optional[Callable[[Any], Optional[datetime]]] = None,
+):
+    """
+    Decorator para cache de funções.
+
+    A chave é montada por build_cache_key com os argumentos da chamada (defaults aplicados, sem
+    dependências como a sessão do banco) ou apenas com `key_params`, quando informado.
+    l1=True também guarda o resultado na camada L1 do processo. Com `namespace`, a chave inclui a
+    geração do namespace e invalidate_namespace(namespace) descarta todas as entradas de uma vez.
+    A chave de uma chamada pode ser obtida com `await funcao.cache_key(*args, **kwargs)`.
+
+    Falhas concorrentes da mesma chave são coalescidas (single-flight): só uma chamada executa a
+    função e as demais recebem o mesmo resultado. Com `stale_while_revalidate`, uma entrada vencida
+    há menos desses segundos ainda é servida enquanto uma tarefa em segundo plano a recalcula.
+
+    Com `response_model`, o resultado é validado uma única vez, no cálculo, e o cache guarda o JSON
+    final; a função passa a retornar um CachedResponse (ou None quando o resultado for None).
+    Os validadores HTTP ficam na mesma entrada e voltam como cabeçalhos do CachedResponse: ETag
+    (`etag(resultado)` ou um hash do corpo) e Last-Modified (`last_modified(resultado)`, se informado).
+    Corpos a partir de COMPRESSION_MIN_SIZE também guardam as versões gzip/br, comprimidas uma única vez.
+    """
     def decorator(func: F) -> F:
+        signature = inspect.signature(func)
+        ttl = settings.REDIS_CACHE_EXPIRE if expire is None else expire
+        entry_ttl = ttl + stale_while_revalidate if stale_while_revalidate else expire
+
+        async def cache_key(*args, **kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: value
+                for name, value in bound.arguments.items()
+                if (key_params is None or name in key_params) and not isinstance(value, DEPENDENCY_TYPES)
+            }
+            version = await get_namespace_version(namespace) if namespace is not None else None
+            return build_cache_key(key_prefix, func.__name__, params, version)
+
+        def encode(result: Any) -> bytes:
+            if response_model is not None:
+                body = response_model.model_validate(result).model_dump_json().encode()
+                meta = {"t": time.time(), "etag": etag(result) if etag else content_etag(body)}
+                modified = last_modified(result) if last_modified else None
+                if modified is not None:
+                    meta["lm"] = http_date(modified)
+                return pack_response(meta, body, precompress(body))
+            if stale_while_revalidate:
+                # Guarda o instante do cálculo; a entrada vive ttl + janela de revalidação no cache
+                return serialize({"v": result, "t": time.time()})
+            return serialize(result)
+
+        def decode(raw: bytes) -> Tuple[Any, Optional[float]]:
+            """Valor a devolver e instante em que foi calculado (quando conhecido)"""
+            if response_model is not None:
+                meta, body, variants = unpack_response(raw)
+                headers = {"ETag": meta["etag"]}
+                if "lm" in meta:
+                    headers["Last-Modified"] = meta["lm"]
+                return CachedResponse(body, headers=headers, variants=variants), meta["t"]
+            if stale_while_revalidate:
+                envelope = deserialize(raw)
+                return envelope["v"], envelope["t"]
+            return deserialize(raw), None
+
+        async def compute(key: str, args, kwargs) -> Any:
+            logger.debug("Cache miss para %s", key)
+            result = await func(*args, **kwargs)
+            if result is None:
+                return None
+            raw = encode(result)
+            await set_raw(key, raw, entry_ttl, l1=l1)
+            # No modo resposta cada chamada monta o próprio Response a partir dos mesmos bytes
+            return raw if response_model is not None else result
+
+        async def revalidate(key: str, args, kwargs) -> None:
+            args = [_fresh_dependency(a) for a in args]
+            kwargs = {k: _fresh_dependency(v) for k, v in kwargs.items()}
+            try:
+                await _single_flight(key, lambda: compute(key, args, kwargs))
+            except Exception as e:
+                logger.warning("Erro ao revalidar cache %s: %s", key, e)
+            finally:
+                for value in [*args, *kwargs.values()]:
+                    if isinstance(value, AsyncSession):
+                        await value.close()
+                    elif isinstance(value, Session):
+                        value.close()
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            cache_key = f"{key_prefix}:{func.__name__}"
-
-            if args:
-                cache_key += f":{str(args)}"
-            if kwargs:
-                cache_key += f":{str(kwargs)}"
-            
-            cached_result = get_cache(cache_key)
-            if cached_result is not None:
-                print(f"Cache hit para {cache_key}")
-                return cached_result
-
-            print(f"Cache miss para {cache_key}")
-            result = await func(*args, **kwargs)
+            key = await cache_key(*args, **kwargs)
 
-            set_cache(cache_key, result, expire)
-            
+            raw = await get_raw(key, l1=l1)
+            if raw is not None:
+                try:
+                    value, computed_at = decode(raw)
+                except (ValueError, KeyError, TypeError) as e:
+                    # Entrada gravada em outro formato (ex.: troca de CACHE_SERIALIZER): recalcula
+                    logger.warning("Erro ao deserializar cache %s: %s", key, e)
+                else:
+                    logger.debug("Cache hit para %s", key)
+                    if (
+                        stale_while_revalidate
+                        and time.time() - computed_at >= ttl
+                        and key not in _inflight
+                    ):
+                        task = asyncio.create_task(revalidate(key, args, kwargs))
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_tasks.discard)
+                    return value
+
+            result = await _single_flight(key, lambda: compute(key, args, kwargs))
+            if response_model is not None and result is not None:
+                return decode(result)[0]
             return result
+
+        wrapper.cache_key = cache_key
         return wrapper
     return decorator
@@ -0,0 +1,209 @@
+import logging
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Cada codificação fornece compress(body) e um par (process, finish) para respostas em streaming
+Codec = Tuple[Callable[[bytes], bytes], Callable[[], Tuple[Callable[[bytes], bytes], Callable[[], bytes]]]]
+
+
+def _gzip_codec() -> Codec:
+    level = settings.COMPRESSION_GZIP_LEVEL
+
+    def stream():
+        # wbits=31: cabeçalho e rodapé gzip
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+
+    return lambda body: zlib.compress(body, level, 31), stream
+
+
+def _brotli_codec() -> Codec:
+    import brotli
+    quality = settings.COMPRESSION_BROTLI_QUALITY
+
+    def stream():
+        compressor = brotli.Compressor(quality=quality)
+        return compressor.process, compressor.finish
+
+    return lambda body: brotli.compress(body, quality=quality), stream
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {
+    "br": _brotli_codec,
+    "gzip": _gzip_codec,
+}
+
+
+def load_codecs(names: Iterable[str]) -> Dict[str, Codec]:
+    """Codecs configurados, na ordem de preferência; os que não têm a biblioteca instalada são ignorados"""
+    codecs = {}
+    for name in names:
+        try:
+            codecs[name] = CODECS[name]()
+        except KeyError:
+            raise ValueError(f"Codificação de resposta desconhecida: {name}")
+        except ImportError as e:
+            logger.warning("Codificação %s indisponível (%s), ignorando.", name, e)
+    return codecs
+
+
+_codecs = load_codecs(settings.COMPRESSION_ENCODINGS) if settings.COMPRESSION_ENABLED else {}
+
+
+def available_encodings() -> List[str]:
+    """Codificações habilitadas e disponíveis neste processo, em ordem de preferência"""
+    return list(_codecs)
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Codificações do Accept-Encoding com o respectivo q (q=0 recusa)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Melhor codificação aceita pelo cliente entre as disponíveis (maior q; empate segue a ordem de `available`)"""
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    best, best_q = None, 0.0
+    for name in available:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def encoding_etag(etag: str, encoding: str) -> str:
+    """
+    ETag da versão comprimida: o mesmo validador com o sufixo da codificação ("3" vira "3-gzip").
+
+    Cada codificação é uma representação com outros bytes e precisa de uma ETag forte própria; a
+    versão continua recuperável pelo prefixo (ver app/core/etag.py:parse_if_match).
+    """
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    return content_type.split(";")[0].strip().lower() in settings.COMPRESSION_CONTENT_TYPES
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Versões comprimidas do corpo para guardar junto da resposta em cache (vazio abaixo do tamanho mínimo)"""
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    return {name: compress(body) for name, (compress, _) in _codecs.items()}
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas com gzip/brotli conforme o Accept-Encoding.
+
+    Só atua em content-types da lista permitida e em corpos a partir de `minimum_size` bytes; respostas
+    que já chegam com Content-Encoding (ex.: CachedResponse com a versão pré-comprimida) passam direto.
+    Respostas em streaming são comprimidas pedaço a pedaço, sem acumular o corpo.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), _codecs)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(self.app, encoding, _codecs[encoding], self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressingResponder:
+    def __init__(self, app: ASGIApp, encoding: str, codec: Codec, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.codec = codec
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start: Optional[Message] = None
+        # None: ainda não decidido; False: repassa sem comprimir; senão, (process, finish) do streaming
+        self.stream: Any = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def _headers(self) -> MutableHeaders:
+        return MutableHeaders(raw=self.start["headers"])
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Os cabeçalhos só são enviados quando o primeiro pedaço do corpo define o que fazer
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None:
+            headers = self._headers()
+            if (
+                "content-encoding" in headers
+                or self.start["status"] in (204, 304)
+                or not compressible(headers.get("content-type"))
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.stream = False
+            else:
+                headers["Content-Encoding"] = self.encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = encoding_etag(headers["etag"], self.encoding)
+                if not more_body:
+                    body = self.codec[0](body)
+                    headers["Content-Length"] = str(len(body))
+                    self.stream = False
+                    await self.send(self.start)
+                    await self.send({"type": "http.response.body", "body": body})
+                    return
+                del headers["Content-Length"]
+                self.stream = self.codec[1]()
+            await self.send(self.start)
+
+        if self.stream is False:
+            await self.send(message)
+            return
+
+        process, finish = self.stream
+        chunk = process(body)
+        if not more_body:
+            chunk += finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,4 +1,6 @@
+import ast
 import os
+from functools import cached_property
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -14,22 +16,89 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = os.getenv("PROJECT_NAME", "Plataforma de Solicitação de Serviços Municipais")
     API_PREFIX: str = os.getenv("API_PREFIX", "/api")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Tempo máximo, no desligamento do worker, esperando revalidações de cache em andamento
+    SHUTDOWN_DRAIN_TIMEOUT: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))
     
     
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+    # O schema é criado/migrado por `python create_tables.py`, um passo explícito antes de subir o app;
+    # True volta a rodar init_db no lifespan de cada worker (conveniente só em desenvolvimento)
+    DB_INIT_ON_STARTUP: bool = os.getenv("DB_INIT_ON_STARTUP", "False").lower() == "true"
+
+    # Pool de conexões (ignorado no SQLite, exceto o pre-ping)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos esperando uma conexão livre
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # recicla conexões com mais de 30 minutos
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "1"))  # conexões abertas por worker antes de receber tráfego
+    
+    # Máximo de itens por requisição nos endpoints em lote
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+    # Linhas lidas do cursor do banco por vez na exportação (memória constante por lote)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Consultas geográficas
+    GEO_MAX_CELLS: int = int(os.getenv("GEO_MAX_CELLS", "32"))  # células de geohash por consulta
+    GEO_MAX_RADIUS_M: int = int(os.getenv("GEO_MAX_RADIUS_M", "20000"))
+    MAP_MAX_TILES: int = int(os.getenv("MAP_MAX_TILES", "64"))  # tiles de cluster por requisição do mapa
+    # Usa ST_DWithin com índice GiST quando o banco é PostgreSQL com a extensão PostGIS
+    GEO_POSTGIS_ENABLED: bool = os.getenv("GEO_POSTGIS_ENABLED", "False").lower() == "true"
     
     # Redis settings
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_CACHE_ENABLED: bool = os.getenv("REDIS_CACHE_ENABLED", "True").lower() == "true"
     REDIS_CACHE_EXPIRE: int = int(os.getenv("REDIS_CACHE_EXPIRE", "300"))  # Default 5 minutos
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", "2"))  # espera por conexão livre no pool
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))  # timeout de cada comando
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1"))
+    # O Redis conecta no primeiro uso; após uma falha, segundos até tentar de novo (usando o cache local)
+    REDIS_RETRY_INTERVAL: float = float(os.getenv("REDIS_RETRY_INTERVAL", "30"))
+
+    # Cache em memória do processo
+    LOCAL_CACHE_MAXSIZE: int = int(os.getenv("LOCAL_CACHE_MAXSIZE", "10000"))  # fallback sem Redis
+    CACHE_L1_ENABLED: bool = os.getenv("CACHE_L1_ENABLED", "False").lower() == "true"
+    CACHE_L1_MAXSIZE: int = int(os.getenv("CACHE_L1_MAXSIZE", "1000"))
+    CACHE_L1_TTL: int = int(os.getenv("CACHE_L1_TTL", "5"))
+    # Por quantos segundos após expirar uma listagem ainda pode ser servida enquanto é recalculada
+    CACHE_STALE_WHILE_REVALIDATE: int = int(os.getenv("CACHE_STALE_WHILE_REVALIDATE", "30"))
+    # Formato dos valores no cache: json, orjson ou msgpack (msgpack exige a biblioteca instalada)
+    CACHE_SERIALIZER: str = os.getenv("CACHE_SERIALIZER", "orjson")
+    # Cache-Control das rotas de leitura; "no-cache" guarda a resposta e revalida com If-None-Match (304)
+    CACHE_CONTROL_SOLICITACAO: str = os.getenv("CACHE_CONTROL_SOLICITACAO", "no-cache")
+    CACHE_CONTROL_LISTAGEM: str = os.getenv("CACHE_CONTROL_LISTAGEM", "no-cache")
+
+    # Endpoints de diagnóstico (/admin/pool, /admin/cache): exigem este token no cabeçalho X-Admin-Token;
+    # vazio desabilita os endpoints (404)
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+
+    # Compressão das respostas (br exige a biblioteca brotli; sem ela, só gzip)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes; abaixo disso não compensa
+    COMPRESSION_ENCODINGS_STR: str = os.getenv("COMPRESSION_ENCODINGS", "br,gzip")  # em ordem de preferência
+    COMPRESSION_CONTENT_TYPES_STR: str = os.getenv(
+        "COMPRESSION_CONTENT_TYPES", "application/json,application/x-ndjson,text/csv,text/html,text/plain"
+    )
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
     
     # CORS
     ALLOWED_ORIGINS_STR: str = os.getenv("ALLOWED_ORIGINS", '["http://localhost:3000"]')
     
-    @property
+    # Valores derivados calculados uma vez por processo: são lidos a cada requisição/resposta
+    @cached_property
+    def COMPRESSION_ENCODINGS(self) -> list:
+        return [e.strip().lower() for e in self.COMPRESSION_ENCODINGS_STR.split(",") if e.strip()]
+
+    @cached_property
+    def COMPRESSION_CONTENT_TYPES(self) -> frozenset:
+        return frozenset(t.strip().lower() for t in self.COMPRESSION_CONTENT_TYPES_STR.split(",") if t.strip())
+
+    @cached_property
     def ALLOWED_ORIGINS(self) -> list:
         try:
-            import ast
             origins = ast.literal_eval(self.ALLOWED_ORIGINS_STR)
 
             if os.getenv("FRONTEND_URL"):
@@ -54,8 +123,3 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 settings = Settings()
-
-print(f"Ambiente: {settings.ENVIRONMENT}")
-print(f"Configurações carregadas: DATABASE_URL={settings.DATABASE_URL}")
-print(f"Redis Cache: {'Enabled' if settings.REDIS_CACHE_ENABLED else 'Disabled'}, URL={settings.REDIS_URL}")
-print(f"CORS permitido para: {settings.ALLOWED_ORIGINS}")
@@ -1,10 +1,16 @@
+import json
+import logging
 import os
 import sys
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, insert, inspect, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.pool import pool_options, pool_status, warm_pool
+
+logger = logging.getLogger(__name__)
 
 
 connect_args = {}
@@ -22,45 +28,228 @@ if settings.DATABASE_URL.startswith("sqlite"):
     if not os.path.exists(db_dir) and db_dir != '.':
         try:
             os.makedirs(db_dir)
-            print(f"Diretório criado: {db_dir}")
+            logger.info("Diretório criado: %s", db_dir)
         except Exception as e:
-            print(f"Erro ao criar diretório: {e}")
+            logger.error("Erro ao criar diretório: %s", e)
+
+
+def to_async_url(database_url: str) -> str:
+    """Troca o driver síncrono da URL pelo equivalente assíncrono (asyncpg/aiosqlite)"""
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if database_url.startswith(("postgresql:", "postgres:")):
+        return "postgresql+asyncpg:" + database_url.split(":", 1)[1]
+    if database_url.startswith("postgresql+psycopg2:"):
+        return database_url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    return database_url
 
-print(f"Conectando ao banco de dados: {settings.DATABASE_URL}")
 
+# Os engines não abrem conexões aqui: com o app pré-carregado no processo mestre do gunicorn, cada
+# worker abre as suas depois do fork (warm_up_pool no lifespan) e as fecha em dispose_engines.
 try:
     engine = create_engine(
         settings.DATABASE_URL, connect_args=connect_args
     )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    print("Conexão com o banco de dados estabelecida com sucesso.")
+    async_engine = create_async_engine(
+        to_async_url(settings.DATABASE_URL), connect_args=connect_args, **pool_options(settings.DATABASE_URL)
+    )
 except Exception as e:
-    print(f"ERRO AO CONECTAR AO BANCO DE DADOS: {e}")
-    print("Usando SQLite como fallback...")
+    logger.error("Erro ao configurar o banco de dados (%s); usando SQLite como fallback", e)
 
     sqlite_url = "sqlite:///./sql_app.db" 
     connect_args = {"check_same_thread": False}
     engine = create_engine(sqlite_url, connect_args=connect_args)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async_engine = create_async_engine(
+        to_async_url(sqlite_url), connect_args=connect_args, **pool_options(sqlite_url)
+    )
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_pool_status() -> dict:
+    return pool_status(async_engine.pool)
+
+
+async def warm_up_pool() -> None:
+    """Abre DB_POOL_WARMUP conexões do pool deste worker antes de ele receber requisições"""
+    abertas = await warm_pool(async_engine, settings.DB_POOL_WARMUP)
+    if abertas:
+        logger.info("Pool do banco aquecido com %d conexões", abertas)
+
+
+async def dispose_engines() -> None:
+    """Fecha as conexões dos pools deste worker no desligamento"""
+    await async_engine.dispose()
+    engine.dispose()
 
 
 def init_db():
     from app.models.solicitacao import Solicitacao, StatusEnum
     
-    print("Criando tabelas no banco de dados...")
+    logger.info("Criando tabelas no banco de dados...")
     try:
         Base.metadata.create_all(bind=engine)
-        print("Tabelas criadas com sucesso no banco de dados.")
+        _add_missing_columns()
+        # create_all não adiciona índices novos a tabelas já existentes
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        _seed_counters()
+        _backfill_concluido_em()
+        _seed_stats()
+        _backfill_geohash()
+        _migrate_fotos_url()
+        _create_postgis_index()
+        _create_search_index()
+        logger.info("Tabelas criadas com sucesso no banco de dados.")
     except Exception as e:
-        print(f"Erro ao criar tabelas: {e}")
+        logger.error("Erro ao criar tabelas: %s", e)
         sys.exit(1)
+
+
+def _seed_counters():
+    """Popula os contadores por status em bancos criados antes deles existirem"""
+    from app.models.solicitacao import SolicitacaoContador
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    with engine.begin() as conn:
+        if conn.execute(select(SolicitacaoContador.status).limit(1)).first() is None:
+            for statement in SolicitacaoRepository.rebuild_counters_statements():
+                conn.execute(statement)
+
+
+def _backfill_concluido_em():
+    """Solicitações concluídas antes da coluna existir: a última atualização é a melhor estimativa"""
+    from app.models.solicitacao import Solicitacao, StatusEnum
+
+    table = Solicitacao.__table__
+    with engine.begin() as conn:
+        conn.execute(
+            update(table)
+            .where(table.c.status == StatusEnum.CONCLUIDO, table.c.concluido_em.is_(None))
+            .values(concluido_em=table.c.atualizado_em)
+        )
+
+
+def _seed_stats():
+    """Popula as estatísticas por categoria/bairro em bancos criados antes delas existirem"""
+    from app.models.solicitacao import Solicitacao, SolicitacaoEstatistica
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    with engine.begin() as conn:
+        vazia = conn.execute(select(SolicitacaoEstatistica.dimensao).limit(1)).first() is None
+        if vazia and conn.execute(select(Solicitacao.id).limit(1)).first() is not None:
+            for statement in SolicitacaoRepository.rebuild_stats_statements(engine.dialect.name):
+                conn.execute(statement)
+
+
+def _add_missing_columns():
+    """Adiciona colunas novas (anuláveis ou com default no banco) a tabelas criadas antes delas existirem"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existentes = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existentes:
+                    continue
+                tipo = column.type.compile(dialect=engine.dialect)
+                if column.nullable:
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}")
+                elif column.server_default is not None:
+                    default = column.server_default.arg
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo} NOT NULL DEFAULT {default}"
+                    )
+                else:
+                    continue
+                logger.info("Coluna %s.%s adicionada.", table.name, column.name)
+
+
+def _backfill_geohash(batch_size: int = 5000):
+    """Calcula o geohash de solicitações com coordenadas gravadas antes da coluna existir"""
+    from app.core.geo import encode_geohash
+    from app.models.solicitacao import Solicitacao
+
+    table = Solicitacao.__table__
+    pendentes = (
+        select(table.c.id, table.c.latitude, table.c.longitude)
+        .where(table.c.geohash.is_(None), table.c.latitude.is_not(None), table.c.longitude.is_not(None))
+        .limit(batch_size)
+    )
+    statement = update(table).where(table.c.id == bindparam("b_id")).values(geohash=bindparam("b_geohash"))
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(pendentes).all()
+            if not rows:
+                return
+            conn.execute(statement, [{"b_id": r.id, "b_geohash": encode_geohash(r.latitude, r.longitude)} for r in rows])
+
+
+def _migrate_fotos_url(batch_size: int = 1000):
+    """
+    Move as fotos da antiga coluna fotos_url (lista JSON em texto) para solicitacao_fotos.
+
+    Cada lote converte as linhas, preenche total_fotos e zera fotos_url na mesma transação, então a migração
+    pode ser interrompida e retomada. A coluna antiga fica vazia na tabela (não é mais mapeada).
+    """
+    from app.models.solicitacao import Solicitacao, SolicitacaoFoto
+
+    if "fotos_url" not in {c["name"] for c in inspect(engine).get_columns(Solicitacao.__tablename__)}:
+        return
+    pendentes = text("SELECT id, fotos_url FROM solicitacoes WHERE fotos_url IS NOT NULL ORDER BY id LIMIT :limite")
+    limpar = text("UPDATE solicitacoes SET fotos_url = NULL WHERE id IN :ids").bindparams(
+        bindparam("ids", expanding=True)
+    )
+    table = Solicitacao.__table__
+    totais = update(table).where(table.c.id == bindparam("b_id")).values(total_fotos=bindparam("b_total"))
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(pendentes, {"limite": batch_size}).all()
+            if not rows:
+                return
+            fotos, contagens = [], []
+            for solicitacao_id, fotos_url in rows:
+                try:
+                    urls = json.loads(fotos_url)
+                except ValueError:
+                    urls = []
+                urls = [u for u in urls if isinstance(u, str)] if isinstance(urls, list) else []
+                fotos.extend({"solicitacao_id": solicitacao_id, "ordem": i, "url": u} for i, u in enumerate(urls))
+                contagens.append({"b_id": solicitacao_id, "b_total": len(urls)})
+            if fotos:
+                conn.execute(insert(SolicitacaoFoto.__table__), fotos)
+            conn.execute(totais, contagens)
+            conn.execute(limpar, {"ids": [r.id for r in rows]})
+            logger.info("Fotos de %d solicitações migradas.", len(rows))
+
+
+def _create_postgis_index():
+    if not settings.GEO_POSTGIS_ENABLED or engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS postgis")
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_solicitacoes_geography ON solicitacoes "
+            "USING gist (geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)))"
+        )
+
+
+def _create_search_index():
+    """Cria o índice de busca textual em bancos existentes; no SQLite, indexa as linhas já gravadas"""
+    from app.core.search import FTS_TABLE, SQLITE_REBUILD, search_ddl
+
+    novo = engine.dialect.name == "sqlite" and not inspect(engine).has_table(FTS_TABLE)
+    with engine.begin() as conn:
+        for statement in search_ddl(engine.dialect.name):
+            conn.exec_driver_sql(statement)
+        if novo:
+            conn.exec_driver_sql(SQLITE_REBUILD)
@@ -0,0 +1,81 @@
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import CachedResponse
+from .compression import CODECS
+
+
+# Cabeçalhos que acompanham um 304 (RFC 9110, 15.4.5)
+NOT_MODIFIED_HEADERS = ("ETag", "Last-Modified", "Cache-Control", "Vary")
+
+
+class StaleVersionError(Exception):
+    """A solicitação foi alterada depois da versão informada pelo cliente (If-Match)"""
+
+
+def version_etag(versao: int) -> str:
+    """ETag forte da representação de uma solicitação: muda a cada escrita junto com a versão"""
+    return f'"{versao}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Versão exigida pelo cabeçalho If-Match; None quando ausente ou "*" (qualquer versão).
+
+    Cada representação tem uma única versão, então basta uma ETag; a versão comprimida ("3-gzip") é a
+    mesma versão em outra codificação. ETags fracas ou desconhecidas nunca casam no If-Match (comparação
+    forte) e levantam StaleVersionError.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    etag = if_match.strip()
+    if etag.startswith('"') and etag.endswith('"'):
+        versao, _, encoding = etag[1:-1].partition("-")
+        if versao.isdigit() and (not encoding or encoding in CODECS):
+            return int(versao)
+    raise StaleVersionError(f"If-Match inválido: {if_match}")
+
+
+def _opaque(etag: str) -> str:
+    # If-None-Match usa comparação fraca: W/"x" e "x" casam
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_fresh(request: Request, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Se a cópia do cliente ainda vale: If-None-Match tem precedência sobre If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return etag is not None
+        return etag is not None and _opaque(etag) in {_opaque(t) for t in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional_response(request: Request, response: Response, cache_control: str) -> Response:
+    """
+    Aplica o Cache-Control da rota e responde 304, sem corpo, quando o cliente já tem a versão atual.
+
+    Os validadores vêm prontos nos cabeçalhos da resposta em cache, então o 304 não serializa nada. Com
+    versões pré-comprimidas, a codificação é escolhida antes: o 304 leva a ETag dessa codificação e o
+    Vary: Accept-Encoding, como a resposta completa levaria.
+    """
+    response.headers["Cache-Control"] = cache_control
+    if isinstance(response, CachedResponse):
+        response.negotiate(request.headers)
+    if request.method in ("GET", "HEAD") and is_fresh(
+        request, response.headers.get("etag"), response.headers.get("last-modified")
+    ):
+        headers = {name: response.headers[name] for name in NOT_MODIFIED_HEADERS if name in response.headers}
+        return Response(status_code=304, headers=headers)
+    return response
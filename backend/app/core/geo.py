@@ -0,0 +1,134 @@
+import math
+from typing import List, NamedTuple, Optional, Tuple
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Maior que qualquer caractere do alfabeto: o intervalo [prefixo, prefixo + "{") contém o prefixo inteiro
+GEOHASH_UPPER_BOUND = "{"
+GEOHASH_PRECISION = 9  # células de ~5 m x 5 m
+EARTH_RADIUS_M = 6_371_008.8
+
+
+class BoundingBox(NamedTuple):
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+
+    def contains(self, lat: float, lon: float) -> bool:
+        return self.min_lat <= lat <= self.max_lat and self.min_lon <= lon <= self.max_lon
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash em base32: bits de longitude e latitude intercalados, 5 por caractere"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_or_none(lat: Optional[float], lon: Optional[float]) -> Optional[str]:
+    if lat is None or lon is None:
+        return None
+    return encode_geohash(lat, lon)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Altura e largura, em graus, de uma célula de geohash com `precision` caracteres"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância em metros sobre a esfera"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat: float, lon: float, radius_m: float) -> BoundingBox:
+    """Menor retângulo em graus que contém o círculo de raio `radius_m`"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-9 else min(180.0, math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)))
+    return BoundingBox(max(-90.0, lat - dlat), max(-180.0, lon - dlon), min(90.0, lat + dlat), min(180.0, lon + dlon))
+
+
+def _cell_index_range(bbox: BoundingBox, precision: int) -> Tuple[range, range]:
+    lat_step, lon_step = cell_size(precision)
+    lat_start = math.floor((bbox.min_lat + 90.0) / lat_step)
+    lat_end = math.floor((min(bbox.max_lat, 90.0 - 1e-12) + 90.0) / lat_step)
+    lon_start = math.floor((bbox.min_lon + 180.0) / lon_step)
+    lon_end = math.floor((min(bbox.max_lon, 180.0 - 1e-12) + 180.0) / lon_step)
+    return range(lat_start, lat_end + 1), range(lon_start, lon_end + 1)
+
+
+def cell_count(bbox: BoundingBox, precision: int) -> int:
+    lats, lons = _cell_index_range(bbox, precision)
+    return len(lats) * len(lons)
+
+
+def cells_at_precision(bbox: BoundingBox, precision: int) -> List[str]:
+    """Células de geohash com `precision` caracteres que cobrem o retângulo"""
+    lat_step, lon_step = cell_size(precision)
+    lats, lons = _cell_index_range(bbox, precision)
+    return sorted({
+        encode_geohash(-90.0 + (i + 0.5) * lat_step, -180.0 + (j + 0.5) * lon_step, precision)
+        for i in lats
+        for j in lons
+    })
+
+
+def covering_cells(bbox: BoundingBox, max_cells: int = 32, max_precision: int = GEOHASH_PRECISION) -> List[str]:
+    """
+    Células de geohash que cobrem o retângulo, na maior precisão com no máximo `max_cells` células.
+
+    Quanto maior a precisão, menos falsos candidatos chegam à verificação exata de distância.
+    """
+    precision = 0
+    while precision < max_precision and cell_count(bbox, precision + 1) <= max_cells:
+        precision += 1
+    return cells_at_precision(bbox, precision) if precision else [""]
+
+
+def _successor(cell: str) -> Optional[str]:
+    """Próxima célula de mesma precisão na ordem lexicográfica (None após a última)"""
+    chars = list(cell)
+    for i in range(len(chars) - 1, -1, -1):
+        index = GEOHASH_ALPHABET.index(chars[i])
+        if index + 1 < len(GEOHASH_ALPHABET):
+            chars[i] = GEOHASH_ALPHABET[index + 1]
+            return "".join(chars[: i + 1]) + GEOHASH_ALPHABET[0] * (len(chars) - i - 1)
+    return None
+
+
+def geohash_ranges(cells: List[str]) -> List[Tuple[str, str]]:
+    """Intervalos [início, fim) de geohash que cobrem as células; células consecutivas viram um intervalo só"""
+    ranges: List[Tuple[str, str]] = []
+    for cell in sorted(cells):
+        if ranges and _successor(ranges[-1][1][: -len(GEOHASH_UPPER_BOUND)]) == cell:
+            ranges[-1] = (ranges[-1][0], cell + GEOHASH_UPPER_BOUND)
+        else:
+            ranges.append((cell, cell + GEOHASH_UPPER_BOUND))
+    return ranges
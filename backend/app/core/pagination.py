@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginação malformado ou adulterado"""
+
+
+def _encode(key: list) -> str:
+    payload = json.dumps(key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(criado_em: datetime, solicitacao_id: int) -> str:
+    """Gera um cursor opaco a partir da chave de ordenação (criado_em, id)"""
+    return _encode([criado_em.isoformat(), solicitacao_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Recupera a chave de ordenação (criado_em, id) de um cursor opaco"""
+    try:
+        criado_em, solicitacao_id = _decode(cursor)
+        return datetime.fromisoformat(criado_em), int(solicitacao_id)
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor inválido: {cursor}") from e
+
+
+def encode_rank_cursor(rank: float, solicitacao_id: int) -> str:
+    """Cursor da busca textual, ordenada por (rank, id)"""
+    return _encode([rank, solicitacao_id])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, solicitacao_id = _decode(cursor)
+        return float(rank), int(solicitacao_id)
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor inválido: {cursor}") from e
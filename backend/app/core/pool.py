@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Métricas acumuladas de obtenção de conexões do pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.acquisitions = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def start(self) -> float:
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def finish(self, started: float, timed_out: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.acquisitions += 1
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "acquisitions": self.acquisitions,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPoolMixin:
+    """Mede o tempo até o pool entregar uma conexão utilizável (espera na fila + pre-ping)"""
+
+    def connect(self):
+        started = pool_stats.start()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.finish(started, timed_out=True)
+            raise
+        except Exception:
+            pool_stats.finish(started)
+            raise
+        pool_stats.finish(started)
+        return connection
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def pool_options(database_url: str) -> Dict[str, Any]:
+    """Argumentos de pool para create_async_engine a partir das configurações"""
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if database_url.startswith("sqlite"):
+        # O aiosqlite abre uma conexão por sessão; não há fila para dimensionar
+        options["poolclass"] = InstrumentedNullPool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def pool_status(pool: Pool) -> Dict[str, Any]:
+    """
+    Estado atual do pool somado às métricas de espera acumuladas.
+
+    Só a API pública do pool é lida (tamanho, conexões em uso e overflow); os limites configurados vêm das
+    configurações usadas para criá-lo (ver pool_options).
+    """
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            timeout=pool.timeout(),
+            recycle=settings.DB_POOL_RECYCLE,
+        )
+    status["pre_ping"] = settings.DB_POOL_PRE_PING
+    status.update(pool_stats.as_dict())
+    return status
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> int:
+    """
+    Abre até `connections` conexões em paralelo e as devolve ao pool, que as mantém abertas.
+
+    Sem efeito em pools sem fila (NullPool do SQLite). Falhas são registradas e não impedem a subida
+    do worker: as requisições tentam de novo ao pedir uma conexão. Retorna quantas conexões foram abertas.
+    """
+    pool = engine.pool
+    if connections <= 0 or not isinstance(pool, AsyncAdaptedQueuePool):
+        return 0
+    results = await asyncio.gather(
+        *[engine.connect().start() for _ in range(min(connections, pool.size()))], return_exceptions=True
+    )
+    abertas = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("Falha ao aquecer o pool do banco: %s", result)
+            continue
+        await result.close()
+        abertas += 1
+    return abertas
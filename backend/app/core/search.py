@@ -0,0 +1,73 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import DDL, Table, event, func, literal_column
+
+
+SEARCH_CONFIG = "portuguese"
+FTS_TABLE = "solicitacoes_fts"
+SEARCH_INDEX = "ix_solicitacoes_busca"
+
+# SQLite: tabela FTS5 com conteúdo externo (não duplica o texto), mantida por triggers.
+# remove_diacritics faz "agua" encontrar "água"; o FTS5 não tem stemmer para português.
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        titulo, descricao, content='solicitacoes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON solicitacoes BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON solicitacoes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, titulo, descricao)
+        VALUES ('delete', old.id, old.titulo, old.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF titulo, descricao ON solicitacoes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, titulo, descricao)
+        VALUES ('delete', old.id, old.titulo, old.descricao);
+        INSERT INTO {FTS_TABLE}(rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao);
+    END""",
+]
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+# PostgreSQL: índice GIN sobre a expressão; é atualizado pelo próprio banco a cada escrita.
+# As consultas precisam usar exatamente a mesma expressão (ver search_vector) para usar o índice.
+_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, titulo), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, descricao), 'B')"
+)
+POSTGRES_DDL = [f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON solicitacoes USING gin (({_VECTOR_SQL}))"]
+
+
+def search_ddl(dialect_name: str) -> List[str]:
+    if dialect_name == "sqlite":
+        return SQLITE_DDL
+    if dialect_name == "postgresql":
+        return POSTGRES_DDL
+    return []
+
+
+def register_search_ddl(table: Table) -> None:
+    """Cria o índice de busca junto com a tabela (create_all)"""
+    for statement in SQLITE_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def search_terms(termo: str) -> List[str]:
+    return re.findall(r"\w+", termo)
+
+
+def fts5_query(termo: str) -> Optional[str]:
+    """Consulta FTS5 com todos os termos obrigatórios; aspas impedem que o texto vire sintaxe do FTS5"""
+    terms = search_terms(termo)
+    return " ".join(f'"{t}"' for t in terms) if terms else None
+
+
+def search_vector():
+    return literal_column(f"({_VECTOR_SQL})")
+
+
+def search_query(termo: str):
+    return func.plainto_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), termo)
@@ -1,14 +1,55 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import make_url
 
 from app.api.routes import router as api_router
+from app.core.cache import close_cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import dispose_engines, init_db, warm_up_pool
+
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de cada worker.
+
+    Roda depois do fork (o gunicorn pode pré-carregar o app no processo mestre): cada worker abre as
+    primeiras conexões com o banco antes de receber tráfego; o Redis conecta no primeiro uso do cache.
+    O schema não é criado aqui (ver create_tables.py), a não ser com DB_INIT_ON_STARTUP. No
+    desligamento, as requisições em andamento já terminaram; as revalidações de cache são aguardadas
+    e os pools, fechados.
+    """
+    logger.info(
+        "Ambiente: %s; banco: %s; Redis: %s",
+        settings.ENVIRONMENT,
+        make_url(settings.DATABASE_URL).render_as_string(hide_password=True),
+        settings.REDIS_URL if settings.REDIS_CACHE_ENABLED else "desabilitado",
+    )
+    if settings.DB_INIT_ON_STARTUP:
+        init_db()
+    logger.info("CORS configurado para aceitar origens: %s", settings.ALLOWED_ORIGINS)
+    await warm_up_pool()
+    yield
+    await close_cache()
+    await dispose_engines()
+    logger.info("Conexões do worker encerradas.")
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API para o sistema de Solicitação de Serviços Municipais",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -18,8 +59,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # O frontend lê o ETag para enviar If-Match/If-None-Match
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# Comprime respostas grandes (listagens, exportação); respostas do cache já vêm pré-comprimidas
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
@@ -32,12 +78,7 @@ async def health_check():
 async def root():
     return {"message": "API ativa e funcionando! Acesse /docs para a documentação."}
 
-@app.on_event("startup")
-async def startup_db_client():
-    init_db()
-    print("Banco de dados inicializado com sucesso!")
-    print(f"CORS configurado para aceitar origens: {settings.ALLOWED_ORIGINS}")
-
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # Recarregamento automático só em desenvolvimento; em produção use o gunicorn (gunicorn.conf.py)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.ENVIRONMENT == "development")
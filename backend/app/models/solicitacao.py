@@ -1,7 +1,17 @@
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Enum as SQLEnum
+from sqlalchemy import Column, ForeignKey, Integer, String, Text, DateTime, Float, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.core.geo import geohash_or_none
+from app.core.search import register_search_ddl
+
+
+def _geohash_default(context) -> str:
+    # Calculado no INSERT a partir das coordenadas, inclusive em inserções em lote (executemany)
+    params = context.get_current_parameters()
+    return geohash_or_none(params.get("latitude"), params.get("longitude"))
+
 
 class StatusEnum(str, Enum):
     PENDENTE = "pendente"
@@ -19,11 +29,89 @@ class Solicitacao(Base):
     
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    # Índice espacial portátil (SQLite e PostgreSQL): pontos próximos compartilham prefixo
+    geohash = Column(String(12), nullable=True, default=_geohash_default)
 
     status = Column(SQLEnum(StatusEnum), default=StatusEnum.PENDENTE)
+    # Copiado de status pelo próprio UPDATE, que assim devolve o valor anterior no RETURNING
+    status_anterior = Column(SQLEnum(StatusEnum), nullable=True)
     
     # Metadata
     criado_em = Column(DateTime, default=datetime.utcnow)
     atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Preenchido ao passar para concluído (e mantido se a solicitação for reaberta); base do tempo de resolução
+    concluido_em = Column(DateTime, nullable=True)
+    # Controle de concorrência otimista: incrementada a cada escrita, exposta como ETag
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
     
-    fotos_url = Column(Text, nullable=True)
+    # Fotos ficam em solicitacao_fotos; o total evita consultar a relação quando não há fotos e pode ser filtrado
+    total_fotos = Column(Integer, nullable=False, default=0, server_default="0")
+    # lazy="raise": as fotos são sempre carregadas em lote (selectinload), nunca uma consulta por linha
+    fotos = relationship(
+        "SolicitacaoFoto", order_by="SolicitacaoFoto.ordem", lazy="raise", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # Índice da paginação por cursor (keyset): ORDER BY criado_em DESC, id DESC
+        Index("ix_solicitacoes_criado_em_id", criado_em.desc(), id.desc()),
+        # Filtros da listagem: igualdade na primeira coluna, mesma ordenação da paginação em seguida
+        Index("ix_solicitacoes_status_criado_em_id", status, criado_em.desc(), id.desc()),
+        Index("ix_solicitacoes_categoria_criado_em_id", categoria, criado_em.desc(), id.desc()),
+        Index("ix_solicitacoes_bairro_criado_em_id", bairro, criado_em.desc(), id.desc()),
+        Index("ix_solicitacoes_geohash", geohash),
+        Index("ix_solicitacoes_total_fotos", total_fotos),
+    )
+
+
+# Busca textual em titulo/descricao: FTS5 no SQLite, GIN sobre tsvector no PostgreSQL
+register_search_ddl(Solicitacao.__table__)
+
+
+class SolicitacaoFoto(Base):
+    """URL de uma foto da solicitação, na ordem em que foi enviada"""
+    __tablename__ = "solicitacao_fotos"
+
+    id = Column(Integer, primary_key=True)
+    solicitacao_id = Column(Integer, ForeignKey("solicitacoes.id", ondelete="CASCADE"), nullable=False)
+    ordem = Column(Integer, nullable=False, default=0)
+    url = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_solicitacao_fotos_solicitacao_ordem", solicitacao_id, ordem),
+    )
+
+
+class SolicitacaoContador(Base):
+    """Total de solicitações por status, mantido na mesma transação das escritas"""
+    __tablename__ = "solicitacao_contadores"
+
+    status = Column(SQLEnum(StatusEnum), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class SolicitacaoEstatistica(Base):
+    """Contagem e tempo de resolução acumulados por categoria/bairro e status, mantidos a cada escrita"""
+    __tablename__ = "solicitacao_estatisticas"
+
+    dimensao = Column(String(20), primary_key=True)  # "categoria" ou "bairro"
+    valor = Column(String(100), primary_key=True)
+    status = Column(SQLEnum(StatusEnum), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    # Soma de (concluido_em - criado_em) das solicitações concluídas, em segundos
+    segundos_resolucao = Column(Float, nullable=False, default=0)
+
+
+class SolicitacaoHistorico(Base):
+    """Transições de status (somente inserção), gravadas na mesma transação da mudança"""
+    __tablename__ = "solicitacao_historico"
+
+    id = Column(Integer, primary_key=True)
+    solicitacao_id = Column(Integer, ForeignKey("solicitacoes.id", ondelete="CASCADE"), nullable=False)
+    status_anterior = Column(SQLEnum(StatusEnum), nullable=False)
+    status = Column(SQLEnum(StatusEnum), nullable=False)
+    alterado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Histórico de uma solicitação em ordem e a transição anterior (LAG) nas análises de tempo
+        Index("ix_solicitacao_historico_solicitacao_alterado_em", solicitacao_id, alterado_em),
+    )
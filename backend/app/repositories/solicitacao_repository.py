@@ -1,27 +1,554 @@
 import json
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Row, Select, and_, case, column, delete, func, insert, literal, literal_column, or_, select, table, text, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.solicitacao import Solicitacao, StatusEnum
-from app.schemas.solicitacao import SolicitacaoCreate, SolicitacaoUpdate
+from app.core.config import settings
+from app.core.etag import StaleVersionError
+from app.core.geo import GEOHASH_UPPER_BOUND, BoundingBox, bbox_around, covering_cells, geohash_ranges, haversine_m
+from app.core.search import FTS_TABLE, fts5_query, search_query, search_terms, search_vector
+
+from app.models.solicitacao import (
+    Solicitacao,
+    SolicitacaoContador,
+    SolicitacaoEstatistica,
+    SolicitacaoFoto,
+    SolicitacaoHistorico,
+    StatusEnum,
+)
+from app.schemas.solicitacao import SolicitacaoCreate, SolicitacaoFiltros, SolicitacaoUpdate, TotalModo
+
+# list_near sem PostGIS: candidatas buscadas além do limite, porque a ordem pela distância aproximada
+# pode trocar pontos quase equidistantes de lugar em relação à distância exata
+NEAR_OVERFETCH = 2
+
+
+def _seconds_between(dialect_name: str, inicio, fim):
+    """Diferença fim - inicio em segundos, como expressão SQL"""
+    if dialect_name == "postgresql":
+        return func.extract("epoch", fim - inicio)
+    return (func.julianday(fim) - func.julianday(inicio)) * 86400.0
+
+
+def _upsert(dialect_name: str, tabela):
+    """INSERT do dialeto, com on_conflict_do_update (INSERT ... ON CONFLICT no PostgreSQL e no SQLite)"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(tabela)
+    return sqlite.insert(tabela)
 
 class SolicitacaoRepository:
     @staticmethod
-    def get_by_id(db: Session, solicitacao_id: int) -> Optional[Solicitacao]:
-        return db.query(Solicitacao).filter(Solicitacao.id == solicitacao_id).first()
-    
+    def _apply_filters(query: Select, filtros: Optional[SolicitacaoFiltros]) -> Select:
+        if filtros is None:
+            return query
+        if filtros.status is not None:
+            query = query.where(Solicitacao.status == filtros.status)
+        if filtros.categoria is not None:
+            query = query.where(Solicitacao.categoria == filtros.categoria)
+        if filtros.bairro is not None:
+            query = query.where(Solicitacao.bairro == filtros.bairro)
+        if filtros.criado_de is not None:
+            query = query.where(Solicitacao.criado_em >= filtros.criado_de)
+        if filtros.criado_ate is not None:
+            query = query.where(Solicitacao.criado_em < filtros.criado_ate)
+        if filtros.com_fotos is not None:
+            query = query.where(Solicitacao.total_fotos > 0 if filtros.com_fotos else Solicitacao.total_fotos == 0)
+        return query
+
+    @staticmethod
+    async def _load_fotos(db: AsyncSession, solicitacoes: Sequence[Solicitacao]) -> None:
+        """
+        Carrega as fotos das entidades com uma única consulta IN, como o selectinload, mas só para as que
+        têm fotos (total_fotos > 0): páginas sem fotos não fazem consulta extra.
+        """
+        com_fotos = {s.id: s for s in solicitacoes if s.total_fotos}
+        fotos = defaultdict(list)
+        if com_fotos:
+            result = await db.scalars(
+                select(SolicitacaoFoto)
+                .where(SolicitacaoFoto.solicitacao_id.in_(com_fotos))
+                .order_by(SolicitacaoFoto.solicitacao_id, SolicitacaoFoto.ordem)
+            )
+            for foto in result:
+                fotos[foto.solicitacao_id].append(foto)
+        for s in solicitacoes:
+            set_committed_value(s, "fotos", fotos.get(s.id, []))
+
+    @staticmethod
+    async def fotos_urls(db: AsyncSession, solicitacao_ids: Sequence[int]) -> Dict[int, List[str]]:
+        """URLs das fotos por solicitação, em uma única consulta"""
+        urls = defaultdict(list)
+        if solicitacao_ids:
+            result = await db.execute(
+                select(SolicitacaoFoto.solicitacao_id, SolicitacaoFoto.url)
+                .where(SolicitacaoFoto.solicitacao_id.in_(solicitacao_ids))
+                .order_by(SolicitacaoFoto.solicitacao_id, SolicitacaoFoto.ordem)
+            )
+            for solicitacao_id, url in result:
+                urls[solicitacao_id].append(url)
+        return urls
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, solicitacao_id: int) -> Optional[Solicitacao]:
+        result = await db.execute(
+            select(Solicitacao).where(Solicitacao.id == solicitacao_id)
+        )
+        solicitacao = result.scalars().first()
+        if solicitacao is not None:
+            await SolicitacaoRepository._load_fotos(db, [solicitacao])
+        return solicitacao
+
+    @staticmethod
+    async def list_all(
+        db: AsyncSession, skip: int = 0, limit: int = 100, filtros: Optional[SolicitacaoFiltros] = None
+    ) -> List[Solicitacao]:
+        query = (
+            SolicitacaoRepository._apply_filters(select(Solicitacao), filtros)
+            .order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        solicitacoes = list(result.scalars().all())
+        await SolicitacaoRepository._load_fotos(db, solicitacoes)
+        return solicitacoes
+
+    @staticmethod
+    async def list_after(
+        db: AsyncSession,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> List[Solicitacao]:
+        """Paginação keyset: lê a partir da chave (criado_em, id) sem OFFSET"""
+        query = SolicitacaoRepository._apply_filters(select(Solicitacao), filtros)
+        if after is not None:
+            query = query.where(tuple_(Solicitacao.criado_em, Solicitacao.id) < tuple(after))
+        query = query.order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc()).limit(limit)
+        result = await db.execute(query)
+        solicitacoes = list(result.scalars().all())
+        await SolicitacaoRepository._load_fotos(db, solicitacoes)
+        return solicitacoes
+
+    @staticmethod
+    async def list_columns(
+        db: AsyncSession,
+        colunas: Sequence[str],
+        skip: int = 0,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 100,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> List[Row]:
+        """
+        Página com apenas as colunas pedidas, como tuplas (sem entidades nem identity map).
+
+        id e criado_em vêm sempre, para montar o próximo cursor; com `after`, a paginação é keyset.
+        """
+        tabela = Solicitacao.__table__
+        nomes = {"id", "criado_em", *colunas}
+        query = SolicitacaoRepository._apply_filters(
+            select(*[c for c in tabela.columns if c.name in nomes]), filtros
+        )
+        if after is not None:
+            query = query.where(tuple_(Solicitacao.criado_em, Solicitacao.id) < tuple(after))
+        else:
+            query = query.offset(skip)
+        query = query.order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return list(result.all())
+
+    @staticmethod
+    async def stream_all(
+        db: AsyncSession, filtros: Optional[SolicitacaoFiltros] = None, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Percorre todas as linhas com cursor no servidor, entregando lotes de `batch_size` linhas"""
+        # Colunas em vez de entidades: nada passa pelo identity map da sessão
+        query = (
+            SolicitacaoRepository._apply_filters(select(*Solicitacao.__table__.columns), filtros)
+            .order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc())
+            .execution_options(yield_per=batch_size)
+        )
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+    @staticmethod
+    def _within_bbox(query: Select, bbox: BoundingBox) -> Select:
+        """Pré-filtro pelo índice de geohash (intervalos de prefixo), refinado pelas coordenadas"""
+        ranges = geohash_ranges(covering_cells(bbox, settings.GEO_MAX_CELLS))
+        return query.where(
+            or_(*[and_(Solicitacao.geohash >= start, Solicitacao.geohash < end) for start, end in ranges]),
+            Solicitacao.latitude.between(bbox.min_lat, bbox.max_lat),
+            Solicitacao.longitude.between(bbox.min_lon, bbox.max_lon),
+        )
+
+    @staticmethod
+    def _geography(longitude, latitude):
+        # Mesma expressão do índice GiST criado por init_db quando GEO_POSTGIS_ENABLED
+        return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+
+    @staticmethod
+    async def list_near(
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        raio_m: float,
+        limit: int = 100,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> List[Tuple[Solicitacao, float]]:
+        """Solicitações a até `raio_m` metros do ponto, da mais próxima para a mais distante"""
+        query = SolicitacaoRepository._apply_filters(select(Solicitacao), filtros)
+
+        if settings.GEO_POSTGIS_ENABLED and db.bind.dialect.name == "postgresql":
+            geography = SolicitacaoRepository._geography(Solicitacao.longitude, Solicitacao.latitude)
+            ponto = SolicitacaoRepository._geography(longitude, latitude)
+            distancia = func.ST_Distance(geography, ponto)
+            result = await db.execute(
+                query.add_columns(distancia)
+                .where(func.ST_DWithin(geography, ponto, raio_m))
+                .order_by(distancia)
+                .limit(limit)
+            )
+            proximas = [(s, float(d)) for s, d in result.all()]
+            await SolicitacaoRepository._load_fotos(db, [s for s, _ in proximas])
+            return proximas
+
+        # Candidatas só com id e coordenadas, ordenadas no banco por uma distância aproximada
+        # (equiretangular, em graus²) e limitadas; a distância exata e as entidades vêm depois
+        escala_lon = math.cos(math.radians(latitude))
+        dlat = Solicitacao.latitude - latitude
+        dlon = (Solicitacao.longitude - longitude) * escala_lon
+        candidatas_query = SolicitacaoRepository._within_bbox(
+            SolicitacaoRepository._apply_filters(
+                select(Solicitacao.id, Solicitacao.latitude, Solicitacao.longitude), filtros
+            ),
+            bbox_around(latitude, longitude, raio_m),
+        )
+        candidatas = await db.execute(
+            candidatas_query.order_by(dlat * dlat + dlon * dlon, Solicitacao.id).limit(limit * NEAR_OVERFETCH)
+        )
+        distancias = []
+        for id, lat, lon in candidatas:
+            distancia = haversine_m(latitude, longitude, lat, lon)
+            if distancia <= raio_m:
+                distancias.append((distancia, id))
+        distancias.sort()
+        distancias = distancias[:limit]
+        if not distancias:
+            return []
+
+        result = await db.execute(select(Solicitacao).where(Solicitacao.id.in_([id for _, id in distancias])))
+        por_id = {s.id: s for s in result.scalars()}
+        proximas = [(por_id[id], distancia) for distancia, id in distancias]
+        await SolicitacaoRepository._load_fotos(db, [s for s, _ in proximas])
+        return proximas
+
+    @staticmethod
+    async def list_in_bbox(
+        db: AsyncSession, bbox: BoundingBox, limit: int = 100, filtros: Optional[SolicitacaoFiltros] = None
+    ) -> List[Solicitacao]:
+        query = SolicitacaoRepository._within_bbox(
+            SolicitacaoRepository._apply_filters(select(Solicitacao), filtros), bbox
+        )
+        query = query.order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc()).limit(limit)
+        result = await db.execute(query)
+        solicitacoes = list(result.scalars().all())
+        await SolicitacaoRepository._load_fotos(db, solicitacoes)
+        return solicitacoes
+
+    @staticmethod
+    async def cluster_counts(db: AsyncSession, tile: str, precision: int) -> List[Row]:
+        """
+        Agregados por célula de geohash com `precision` caracteres e por status dentro de um tile.
+
+        Cada linha traz (celula, status, total, soma_lat, soma_lon); o intervalo do tile usa o índice de geohash.
+        """
+        celula = func.substr(Solicitacao.geohash, 1, precision)
+        query = (
+            select(
+                celula.label("celula"),
+                Solicitacao.status,
+                func.count(Solicitacao.id).label("total"),
+                func.sum(Solicitacao.latitude).label("soma_lat"),
+                func.sum(Solicitacao.longitude).label("soma_lon"),
+            )
+            .where(Solicitacao.geohash >= tile, Solicitacao.geohash < tile + GEOHASH_UPPER_BOUND)
+            .group_by(celula, Solicitacao.status)
+        )
+        result = await db.execute(query)
+        return list(result.all())
+
     @staticmethod
-    def list_all(db: Session, skip: int = 0, limit: int = 100) -> List[Solicitacao]:
-        return db.query(Solicitacao).order_by(Solicitacao.criado_em.desc()).offset(skip).limit(limit).all()
-        
+    async def search(
+        db: AsyncSession,
+        termo: str,
+        limit: int = 20,
+        after: Optional[Tuple[float, int]] = None,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> List[Tuple[Solicitacao, float]]:
+        """
+        Busca textual em titulo e descricao, da mais relevante para a menos relevante.
+
+        O rank é "menor é melhor" nos dois bancos (bm25 do FTS5; ts_rank_cd negado no PostgreSQL), e a
+        paginação é keyset sobre (rank, id), com `after` vindo da última linha da página anterior.
+        """
+        if not search_terms(termo):
+            return []
+
+        if db.bind.dialect.name == "postgresql":
+            vector = search_vector()
+            tsquery = search_query(termo)
+            ranked = (
+                select(Solicitacao.id.label("id"), (-func.ts_rank_cd(vector, tsquery)).label("rank"))
+                .where(vector.op("@@")(tsquery))
+                .subquery()
+            )
+        else:
+            fts = table(FTS_TABLE, column("rowid"))
+            # Título pesa o dobro da descrição no bm25
+            ranked = (
+                select(fts.c.rowid.label("id"), literal_column(f"bm25({FTS_TABLE}, 2.0, 1.0)").label("rank"))
+                .select_from(fts)
+                .where(text(f"{FTS_TABLE} MATCH :termo").bindparams(termo=fts5_query(termo)))
+                .subquery()
+            )
+
+        query = SolicitacaoRepository._apply_filters(
+            select(Solicitacao, ranked.c.rank).join(ranked, ranked.c.id == Solicitacao.id), filtros
+        )
+        if after is not None:
+            rank, solicitacao_id = after
+            query = query.where(or_(ranked.c.rank > rank, and_(ranked.c.rank == rank, Solicitacao.id < solicitacao_id)))
+        query = query.order_by(ranked.c.rank, Solicitacao.id.desc()).limit(limit)
+        result = await db.execute(query)
+        encontradas = [(s, rank) for s, rank in result.all()]
+        await SolicitacaoRepository._load_fotos(db, [s for s, _ in encontradas])
+        return encontradas
+
     @staticmethod
-    def get_count(db: Session) -> int:
-        return db.query(Solicitacao).count()
-    
+    async def get_count(
+        db: AsyncSession, filtros: Optional[SolicitacaoFiltros] = None, modo: TotalModo = TotalModo.EXACT
+    ) -> Optional[int]:
+        if modo == TotalModo.NONE:
+            return None
+
+        filtros = filtros or SolicitacaoFiltros()
+        if filtros.model_dump(exclude={"status"}, exclude_none=True) == {}:
+            # Sem filtros além do status: os contadores mantidos já são exatos
+            return await SolicitacaoRepository._count_from_counters(db, filtros.status)
+
+        if modo == TotalModo.ESTIMATE and db.bind.dialect.name == "postgresql":
+            query = SolicitacaoRepository._apply_filters(select(Solicitacao.id), filtros)
+            return await SolicitacaoRepository._estimate_count(db, query)
+
+        query = SolicitacaoRepository._apply_filters(select(func.count(Solicitacao.id)), filtros)
+        return await db.scalar(query)
+
     @staticmethod
-    def create(db: Session, solicitacao: SolicitacaoCreate) -> Solicitacao:
-        fotos_url = json.dumps(solicitacao.fotos_url) if solicitacao.fotos_url else None
-        
+    async def _count_from_counters(db: AsyncSession, status: Optional[StatusEnum] = None) -> int:
+        query = select(func.coalesce(func.sum(SolicitacaoContador.total), 0))
+        if status is not None:
+            query = query.where(SolicitacaoContador.status == status)
+        return await db.scalar(query)
+
+    @staticmethod
+    async def _estimate_count(db: AsyncSession, query: Select) -> int:
+        """Estimativa de linhas do planejador do PostgreSQL (EXPLAIN), sem executar a consulta"""
+        compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        conn = await db.connection()
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    async def _increment_counter(db: AsyncSession, status: StatusEnum, delta: int) -> None:
+        # Upsert atômico: escritas concorrentes que criam o contador de um status não colidem na chave
+        query = _upsert(db.bind.dialect.name, SolicitacaoContador).values(status=status, total=delta)
+        await db.execute(query.on_conflict_do_update(
+            index_elements=[SolicitacaoContador.status],
+            set_={"total": SolicitacaoContador.total + query.excluded.total},
+        ))
+
+    @staticmethod
+    def rebuild_counters_statements() -> list:
+        """Comandos que recalculam os contadores por status a partir da tabela de solicitações"""
+        totals = select(Solicitacao.status, func.count(Solicitacao.id)).group_by(Solicitacao.status)
+        return [
+            delete(SolicitacaoContador),
+            insert(SolicitacaoContador).from_select(["status", "total"], totals),
+        ]
+
+    @staticmethod
+    async def rebuild_counters(db: AsyncSession) -> None:
+        for statement in SolicitacaoRepository.rebuild_counters_statements():
+            await db.execute(statement)
+        await db.commit()
+
+    @staticmethod
+    def _resolution_seconds(solicitacao_status: StatusEnum, criado_em: datetime, concluido_em: Optional[datetime]) -> float:
+        if solicitacao_status != StatusEnum.CONCLUIDO or concluido_em is None or criado_em is None:
+            return 0.0
+        return (concluido_em - criado_em).total_seconds()
+
+    @staticmethod
+    def _stats_delta(
+        deltas: Dict[Tuple[str, str, StatusEnum], List[float]],
+        categoria: str,
+        bairro: str,
+        status: StatusEnum,
+        quantidade: int,
+        segundos: float = 0.0,
+    ) -> None:
+        """Acumula a contribuição de uma solicitação nas estatísticas de categoria e de bairro"""
+        for dimensao, valor in (("categoria", categoria), ("bairro", bairro)):
+            delta = deltas[(dimensao, valor, status)]
+            delta[0] += quantidade
+            delta[1] += segundos
+
+    @staticmethod
+    def _new_stats_deltas() -> Dict[Tuple[str, str, StatusEnum], List[float]]:
+        return defaultdict(lambda: [0, 0.0])
+
+    @staticmethod
+    async def _apply_stats(db: AsyncSession, deltas: Dict[Tuple[str, str, StatusEnum], List[float]]) -> None:
+        # Um único upsert atômico com as chaves em ordem: escritas concorrentes que criam a mesma chave não
+        # colidem e as linhas existentes são travadas sempre na mesma ordem
+        linhas = [
+            {"dimensao": dimensao, "valor": valor, "status": status, "total": quantidade, "segundos_resolucao": segundos}
+            for (dimensao, valor, status), (quantidade, segundos) in sorted(deltas.items(), key=lambda d: str(d[0]))
+            if quantidade != 0 or segundos != 0
+        ]
+        if not linhas:
+            return
+        query = _upsert(db.bind.dialect.name, SolicitacaoEstatistica).values(linhas)
+        await db.execute(query.on_conflict_do_update(
+            index_elements=[SolicitacaoEstatistica.dimensao, SolicitacaoEstatistica.valor, SolicitacaoEstatistica.status],
+            set_={
+                "total": SolicitacaoEstatistica.total + query.excluded.total,
+                "segundos_resolucao": SolicitacaoEstatistica.segundos_resolucao + query.excluded.segundos_resolucao,
+            },
+        ))
+
+    @staticmethod
+    def stats_totals_queries(dialect_name: str) -> List[Select]:
+        """Estatísticas calculadas do zero: (dimensao, valor, status, total, segundos_resolucao)"""
+        segundos = case(
+            (
+                and_(Solicitacao.status == StatusEnum.CONCLUIDO, Solicitacao.concluido_em.is_not(None)),
+                _seconds_between(dialect_name, Solicitacao.criado_em, Solicitacao.concluido_em),
+            ),
+            else_=0.0,
+        )
+        return [
+            select(
+                literal(dimensao).label("dimensao"),
+                coluna.label("valor"),
+                Solicitacao.status,
+                func.count(Solicitacao.id).label("total"),
+                func.coalesce(func.sum(segundos), 0.0).label("segundos_resolucao"),
+            ).group_by(coluna, Solicitacao.status)
+            for dimensao, coluna in (("categoria", Solicitacao.categoria), ("bairro", Solicitacao.bairro))
+        ]
+
+    @staticmethod
+    def rebuild_stats_statements(dialect_name: str) -> list:
+        """Comandos que recalculam as estatísticas por categoria e bairro a partir das solicitações"""
+        columns = ["dimensao", "valor", "status", "total", "segundos_resolucao"]
+        return [delete(SolicitacaoEstatistica)] + [
+            insert(SolicitacaoEstatistica).from_select(columns, query)
+            for query in SolicitacaoRepository.stats_totals_queries(dialect_name)
+        ]
+
+    @staticmethod
+    async def list_stats(db: AsyncSession) -> List[SolicitacaoEstatistica]:
+        result = await db.execute(select(SolicitacaoEstatistica).where(SolicitacaoEstatistica.total != 0))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def count_by_status(db: AsyncSession) -> Dict[StatusEnum, int]:
+        result = await db.execute(select(SolicitacaoContador.status, SolicitacaoContador.total))
+        return {status: total for status, total in result.all()}
+
+    @staticmethod
+    async def _record_transitions(db: AsyncSession, transicoes: List[dict]) -> None:
+        if transicoes:
+            await db.execute(insert(SolicitacaoHistorico), transicoes)
+
+    @staticmethod
+    async def list_historico(db: AsyncSession, solicitacao_id: int) -> List[SolicitacaoHistorico]:
+        result = await db.execute(
+            select(SolicitacaoHistorico)
+            .where(SolicitacaoHistorico.solicitacao_id == solicitacao_id)
+            .order_by(SolicitacaoHistorico.alterado_em, SolicitacaoHistorico.id)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def time_in_status_percentiles(
+        db: AsyncSession, percentis: Sequence[int], desde: Optional[datetime] = None
+    ) -> List[Row]:
+        """
+        Percentis (nearest-rank) do tempo que as solicitações passaram em cada status, por categoria e bairro.
+
+        Cada transição fecha um período no status anterior, iniciado na transição anterior (LAG pelo índice
+        (solicitacao_id, alterado_em)) ou na criação. A ordenação e o ranqueamento ficam no banco, com funções
+        de janela: só as linhas das posições pedidas voltam, uma por percentil e grupo. Os períodos são uma CTE,
+        calculada uma vez para as duas dimensões.
+        Retorna linhas (dimensao, valor, status, amostras, posicao, segundos).
+        """
+        H = SolicitacaoHistorico
+        inicio = func.coalesce(
+            func.lag(H.alterado_em).over(partition_by=H.solicitacao_id, order_by=(H.alterado_em, H.id)),
+            Solicitacao.criado_em,
+        )
+        periodos = (
+            select(
+                H.status_anterior.label("status"),
+                Solicitacao.categoria,
+                Solicitacao.bairro,
+                H.alterado_em,
+                _seconds_between(db.bind.dialect.name, inicio, H.alterado_em).label("segundos"),
+            )
+            .join(Solicitacao, Solicitacao.id == H.solicitacao_id)
+            .cte("periodos")
+        )
+
+        consultas = []
+        for dimensao in ("categoria", "bairro"):
+            grupo = (periodos.c[dimensao], periodos.c.status)
+            ranqueados = select(
+                literal(dimensao).label("dimensao"),
+                periodos.c[dimensao].label("valor"),
+                periodos.c.status,
+                periodos.c.segundos,
+                func.row_number().over(partition_by=grupo, order_by=periodos.c.segundos).label("posicao"),
+                func.count().over(partition_by=grupo).label("amostras"),
+            )
+            if desde is not None:
+                # Filtra depois do LAG para não perder o início dos períodos que terminam a partir de `desde`
+                ranqueados = ranqueados.where(periodos.c.alterado_em >= desde)
+            ranqueados = ranqueados.subquery()
+            consultas.append(
+                select(
+                    ranqueados.c.dimensao, ranqueados.c.valor, ranqueados.c.status,
+                    ranqueados.c.amostras, ranqueados.c.posicao, ranqueados.c.segundos,
+                ).where(or_(*(ranqueados.c.posicao == (ranqueados.c.amostras * p + 99) // 100 for p in percentis)))
+            )
+
+        result = await db.execute(union_all(*consultas))
+        return list(result.all())
+
+    @staticmethod
+    async def create(db: AsyncSession, solicitacao: SolicitacaoCreate) -> Solicitacao:
+        fotos_url = solicitacao.fotos_url or []
+
         db_solicitacao = Solicitacao(
             titulo=solicitacao.titulo,
             descricao=solicitacao.descricao,
@@ -29,20 +556,144 @@ class SolicitacaoRepository:
             bairro=solicitacao.bairro,
             latitude=solicitacao.latitude,
             longitude=solicitacao.longitude,
-            fotos_url=fotos_url,
+            total_fotos=len(fotos_url),
+            fotos=[SolicitacaoFoto(ordem=ordem, url=url) for ordem, url in enumerate(fotos_url)],
         )
         db.add(db_solicitacao)
-        db.commit()
-        db.refresh(db_solicitacao)
+        await SolicitacaoRepository._increment_counter(db, StatusEnum.PENDENTE, 1)
+        deltas = SolicitacaoRepository._new_stats_deltas()
+        SolicitacaoRepository._stats_delta(deltas, solicitacao.categoria, solicitacao.bairro, StatusEnum.PENDENTE, 1)
+        await SolicitacaoRepository._apply_stats(db, deltas)
+        await db.commit()
+        # Sem refresh: os defaults são calculados no INSERT e as fotos já estão na entidade
         return db_solicitacao
-    
+
     @staticmethod
-    def update_status(db: Session, solicitacao_id: int, update: SolicitacaoUpdate) -> Optional[Solicitacao]:
-        db_solicitacao = SolicitacaoRepository.get_by_id(db, solicitacao_id)
-        if not db_solicitacao:
+    async def bulk_create(db: AsyncSession, solicitacoes: Sequence[SolicitacaoCreate]) -> List[Solicitacao]:
+        """Insere o lote com INSERT ... RETURNING (multi-linha no PostgreSQL) e um único commit"""
+        if not solicitacoes:
+            return []
+        rows = [
+            {
+                "titulo": item.titulo,
+                "descricao": item.descricao,
+                "categoria": item.categoria,
+                "bairro": item.bairro,
+                "latitude": item.latitude,
+                "longitude": item.longitude,
+                "total_fotos": len(item.fotos_url or []),
+            }
+            for item in solicitacoes
+        ]
+        # O RETURNING não garante a ordem das linhas; sort_by_parameter_order devolve na ordem do lote,
+        # que é como as fotos são associadas abaixo. No PostgreSQL continua em lotes (sentinela pelo id);
+        # no SQLite, sem sentinela, o SQLAlchemy faz um INSERT por linha.
+        result = await db.scalars(insert(Solicitacao).returning(Solicitacao, sort_by_parameter_order=True), rows)
+        criadas = list(result.all())
+
+        fotos = [
+            {"solicitacao_id": criada.id, "ordem": ordem, "url": url}
+            for criada, item in zip(criadas, solicitacoes)
+            for ordem, url in enumerate(item.fotos_url or [])
+        ]
+        por_solicitacao = defaultdict(list)
+        if fotos:
+            for foto in await db.scalars(insert(SolicitacaoFoto).returning(SolicitacaoFoto), fotos):
+                por_solicitacao[foto.solicitacao_id].append(foto)
+        for criada in criadas:
+            set_committed_value(criada, "fotos", sorted(por_solicitacao[criada.id], key=lambda f: f.ordem))
+
+        await SolicitacaoRepository._increment_counter(db, StatusEnum.PENDENTE, len(criadas))
+        deltas = SolicitacaoRepository._new_stats_deltas()
+        for item in solicitacoes:
+            SolicitacaoRepository._stats_delta(deltas, item.categoria, item.bairro, StatusEnum.PENDENTE, 1)
+        await SolicitacaoRepository._apply_stats(db, deltas)
+        await db.commit()
+        return criadas
+
+    @staticmethod
+    def _status_values(status: StatusEnum, agora: datetime) -> dict:
+        """SET da troca de status; status_anterior recebe o valor antigo para o RETURNING"""
+        values = {"status_anterior": Solicitacao.status, "status": status, "versao": Solicitacao.versao + 1}
+        if status == StatusEnum.CONCLUIDO:
+            # Quem já estava concluída mantém a data original de conclusão
+            values["concluido_em"] = case((Solicitacao.status == StatusEnum.CONCLUIDO, Solicitacao.concluido_em), else_=agora)
+        return values
+
+    @staticmethod
+    async def _after_status_change(db: AsyncSession, atualizadas: List[Solicitacao], agora: datetime) -> None:
+        """Contadores, histórico e estatísticas das solicitações cujo status de fato mudou"""
+        alteradas = [s for s in atualizadas if s.status_anterior != s.status]
+        # Um delta por status, aplicados sempre na mesma ordem: transições opostas concorrentes
+        # (pendente→concluído e concluído→pendente) não travam as linhas dos contadores em ordem inversa
+        contadores: Counter = Counter()
+        for s in alteradas:
+            contadores[s.status_anterior] -= 1
+            contadores[s.status] += 1
+        for status, delta in sorted(contadores.items(), key=lambda c: c[0].value):
+            if delta:
+                await SolicitacaoRepository._increment_counter(db, status, delta)
+
+        await SolicitacaoRepository._record_transitions(db, [
+            {"solicitacao_id": s.id, "status_anterior": s.status_anterior, "status": s.status, "alterado_em": agora}
+            for s in alteradas
+        ])
+
+        deltas = SolicitacaoRepository._new_stats_deltas()
+        for s in alteradas:
+            # Ao sair de concluído, concluido_em ainda guarda a conclusão anterior
+            segundos = SolicitacaoRepository._resolution_seconds(s.status_anterior, s.criado_em, s.concluido_em)
+            SolicitacaoRepository._stats_delta(deltas, s.categoria, s.bairro, s.status_anterior, -1, -segundos)
+            segundos = SolicitacaoRepository._resolution_seconds(s.status, s.criado_em, s.concluido_em)
+            SolicitacaoRepository._stats_delta(deltas, s.categoria, s.bairro, s.status, 1, segundos)
+        await SolicitacaoRepository._apply_stats(db, deltas)
+
+    @staticmethod
+    async def bulk_update_status(db: AsyncSession, ids: Sequence[int], status: StatusEnum) -> List[Solicitacao]:
+        """Atualiza o status de várias solicitações com um único UPDATE ... WHERE id IN; ignora ids inexistentes"""
+        if not ids:
+            return []
+        agora = datetime.utcnow()
+        result = await db.scalars(
+            update(Solicitacao)
+            .where(Solicitacao.id.in_(ids))
+            .values(**SolicitacaoRepository._status_values(status, agora), atualizado_em=agora)
+            .returning(Solicitacao)
+        )
+        atualizadas = list(result.all())
+        if atualizadas:
+            await SolicitacaoRepository._load_fotos(db, atualizadas)
+            await SolicitacaoRepository._after_status_change(db, atualizadas, agora)
+            await db.commit()
+        return atualizadas
+
+    @staticmethod
+    async def update_status(
+        db: AsyncSession, solicitacao_id: int, status_update: SolicitacaoUpdate, versao: Optional[int] = None
+    ) -> Optional[Solicitacao]:
+        """
+        Atualiza o status com um único UPDATE ... RETURNING, sem SELECT antes nem refresh depois.
+
+        O status anterior (contadores, estatísticas e histórico) é copiado para status_anterior pelo próprio
+        UPDATE, que lê e altera a linha atomicamente. Com `versao` (If-Match), a linha só é alterada se ainda
+        estiver nessa versão; caso contrário levanta StaleVersionError.
+        """
+        agora = datetime.utcnow()
+        statement = update(Solicitacao).where(Solicitacao.id == solicitacao_id)
+        if versao is not None:
+            statement = statement.where(Solicitacao.versao == versao)
+        db_solicitacao = (await db.scalars(
+            statement
+            .values(**SolicitacaoRepository._status_values(status_update.status, agora), atualizado_em=agora)
+            .returning(Solicitacao)
+        )).first()
+        if db_solicitacao is None:
+            # Nenhuma linha alterada: solicitação inexistente ou em outra versão
+            if versao is not None and await db.scalar(select(Solicitacao.id).where(Solicitacao.id == solicitacao_id)):
+                raise StaleVersionError(f"Solicitação {solicitacao_id} não está mais na versão {versao}")
             return None
-            
-        db_solicitacao.status = update.status
-        db.commit()
-        db.refresh(db_solicitacao)
+
+        await SolicitacaoRepository._load_fotos(db, [db_solicitacao])
+        await SolicitacaoRepository._after_status_change(db, [db_solicitacao], agora)
+        await db.commit()
         return db_solicitacao
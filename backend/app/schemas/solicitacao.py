@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import List, Optional
+from enum import Enum
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 from app.models.solicitacao import StatusEnum
@@ -29,11 +30,132 @@ class SolicitacaoResponse(SolicitacaoBase):
     criado_em: datetime
     atualizado_em: datetime
     fotos_url: Optional[List[str]] = None
+    versao: int = Field(..., description="Incrementada a cada alteração; enviar como If-Match (\"<versao>\") no PATCH")
 
     class Config:
         orm_mode = True
         
 
+class SolicitacaoFiltros(BaseModel):
+    status: Optional[StatusEnum] = None
+    categoria: Optional[str] = None
+    bairro: Optional[str] = None
+    criado_de: Optional[datetime] = Field(None, description="Criadas a partir desta data (inclusive), em UTC")
+    criado_ate: Optional[datetime] = Field(None, description="Criadas antes desta data (exclusive), em UTC")
+    com_fotos: Optional[bool] = Field(None, description="true: só com fotos; false: só sem fotos")
+
+
+class TotalModo(str, Enum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class ListaVisao(str, Enum):
+    COMPLETA = "completa"
+    RESUMO = "resumo"
+
+
+class ExportFormato(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class SolicitacaoList(BaseModel):
     solicitacoes: List[SolicitacaoResponse]
+    total: Optional[int] = Field(..., description="Total de itens; nulo quando solicitado total=none")
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (paginação keyset)")
+
+
+class SolicitacaoParcialList(BaseModel):
+    solicitacoes: List[Dict[str, Any]] = Field(..., description="Só os campos pedidos em fields (ou os do resumo)")
+    total: Optional[int] = Field(..., description="Total de itens; nulo quando solicitado total=none")
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (paginação keyset)")
+
+
+class SolicitacaoBuscaItem(SolicitacaoResponse):
+    relevancia: float = Field(..., description="Pontuação da busca; maior é mais relevante")
+
+
+class SolicitacaoBuscaList(BaseModel):
+    solicitacoes: List[SolicitacaoBuscaItem]
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página de resultados")
+
+
+class SolicitacaoBulkStatusUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, description="Solicitações a atualizar")
+    status: StatusEnum = Field(..., description="Novo status das solicitações")
+
+
+class SolicitacaoBulkErro(BaseModel):
+    indice: int = Field(..., description="Posição do item no lote enviado")
+    id: Optional[int] = None
+    detalhes: List[Dict[str, Any]]
+
+
+class SolicitacaoBulkResultado(BaseModel):
+    solicitacoes: List[SolicitacaoResponse]
+    erros: List[SolicitacaoBulkErro]
+
+
+class SolicitacaoProxima(SolicitacaoResponse):
+    distancia_m: float = Field(..., description="Distância em metros até o ponto consultado")
+
+
+class SolicitacaoProximaList(BaseModel):
+    solicitacoes: List[SolicitacaoProxima]
+
+
+class SolicitacaoArea(BaseModel):
+    solicitacoes: List[SolicitacaoResponse]
+    truncado: bool = Field(..., description="Há mais solicitações na área do que o limite retornado")
+
+
+class Cluster(BaseModel):
+    geohash: str = Field(..., description="Célula de geohash que o cluster representa")
+    total: int
+    latitude: float = Field(..., description="Centroide das solicitações do cluster")
+    longitude: float
+    status: Dict[str, int] = Field(..., description="Quantidade de solicitações por status")
+
+
+class ClusterList(BaseModel):
+    precisao: int = Field(..., description="Precisão (caracteres de geohash) das células agrupadas")
+    clusters: List[Cluster]
+
+
+class EstatisticaGrupo(BaseModel):
+    valor: str = Field(..., description="Categoria ou bairro")
+    total: int
+    por_status: Dict[str, int]
+    tempo_medio_resolucao_horas: Optional[float] = Field(
+        None, description="Média de (concluído em - criado em) das solicitações concluídas"
+    )
+
+
+class Estatisticas(BaseModel):
     total: int
+    por_status: Dict[str, int]
+    tempo_medio_resolucao_horas: Optional[float]
+    por_categoria: List[EstatisticaGrupo]
+    por_bairro: List[EstatisticaGrupo]
+
+
+class SolicitacaoHistoricoItem(BaseModel):
+    status_anterior: StatusEnum
+    status: StatusEnum
+    alterado_em: datetime
+
+
+class TempoEmStatus(BaseModel):
+    valor: str = Field(..., description="Categoria ou bairro")
+    status: StatusEnum = Field(..., description="Status em que as solicitações permaneceram")
+    amostras: int = Field(..., description="Períodos encerrados nesse status (transições a partir dele)")
+    p50_horas: float
+    p90_horas: float
+    p99_horas: float
+
+
+class TempoEmStatusList(BaseModel):
+    por_categoria: List[TempoEmStatus]
+    por_bairro: List[TempoEmStatus]
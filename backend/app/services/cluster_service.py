@@ -0,0 +1,78 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cached, delete_cache
+from app.core.config import settings
+from app.core.geo import GEOHASH_PRECISION, BoundingBox, cell_count, cells_at_precision
+from app.models.solicitacao import StatusEnum
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+
+MAPA_CACHE_PREFIX = "mapa"
+
+
+def precisions_for_zoom(bbox: BoundingBox, zoom: int) -> Tuple[int, int]:
+    """
+    Precisões (tile, cluster) de geohash para um zoom do mapa (0 a 22).
+
+    Um tile de zoom z tem 360/2^z graus de largura; os clusters ficam ~8x menores que isso. O tile é a
+    célula um caractere mais curta que a do cluster (32 clusters por tile) e é a unidade de cache.
+    """
+    cluster = max(2, min(GEOHASH_PRECISION, round((zoom + 3) * 2 / 5)))
+    while cluster > 2 and cell_count(bbox, cluster - 1) > settings.MAP_MAX_TILES:
+        cluster -= 1
+    return cluster - 1, cluster
+
+
+class ClusterService:
+    @staticmethod
+    @cached(key_prefix=MAPA_CACHE_PREFIX, key_params=("tile",))
+    async def get_tile_clusters(db: AsyncSession, tile: str) -> List[Dict[str, Any]]:
+        """Clusters (células um caractere mais longas que o tile) com contagem, centroide e status"""
+        clusters: Dict[str, Dict[str, Any]] = {}
+        for row in await SolicitacaoRepository.cluster_counts(db, tile, len(tile) + 1):
+            cluster = clusters.setdefault(row.celula, {
+                "geohash": row.celula,
+                "total": 0,
+                "soma_lat": 0.0,
+                "soma_lon": 0.0,
+                "status": {s.value: 0 for s in StatusEnum},
+            })
+            cluster["total"] += row.total
+            cluster["soma_lat"] += row.soma_lat
+            cluster["soma_lon"] += row.soma_lon
+            cluster["status"][row.status.value] += row.total
+
+        return [
+            {
+                "geohash": c["geohash"],
+                "total": c["total"],
+                "latitude": c["soma_lat"] / c["total"],
+                "longitude": c["soma_lon"] / c["total"],
+                "status": c["status"],
+            }
+            for c in clusters.values()
+        ]
+
+    @staticmethod
+    async def list_clusters(db: AsyncSession, bbox: BoundingBox, zoom: int) -> Dict[str, Any]:
+        tile_precision, cluster_precision = precisions_for_zoom(bbox, zoom)
+        clusters = []
+        for tile in cells_at_precision(bbox, tile_precision):
+            clusters.extend(
+                c for c in await ClusterService.get_tile_clusters(db, tile)
+                if bbox.contains(c["latitude"], c["longitude"])
+            )
+        return {"precisao": cluster_precision, "clusters": clusters}
+
+    @staticmethod
+    async def invalidate_tiles(geohashes: Iterable[Optional[str]]) -> None:
+        """Remove do cache só os tiles, em todas as precisões, que contêm os pontos alterados"""
+        tiles = {
+            geohash[:precision]
+            for geohash in geohashes
+            if geohash
+            for precision in range(1, GEOHASH_PRECISION)
+        }
+        if tiles:
+            await delete_cache(*[await ClusterService.get_tile_clusters.cache_key(None, tile) for tile in tiles])
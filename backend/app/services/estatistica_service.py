@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cached
+from app.models.solicitacao import SolicitacaoEstatistica, StatusEnum
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+from app.services.solicitacao_service import LIST_CACHE_NAMESPACE
+
+
+def _media_horas(segundos: float, concluidas: int) -> Optional[float]:
+    return round(segundos / concluidas / 3600, 2) if concluidas else None
+
+
+def _grupos(linhas: List[SolicitacaoEstatistica]) -> List[Dict[str, Any]]:
+    grupos: Dict[str, Dict[str, Any]] = {}
+    for linha in linhas:
+        grupo = grupos.setdefault(linha.valor, {
+            "valor": linha.valor,
+            "total": 0,
+            "por_status": {s.value: 0 for s in StatusEnum},
+            "segundos": 0.0,
+        })
+        grupo["total"] += linha.total
+        grupo["por_status"][linha.status.value] += linha.total
+        grupo["segundos"] += linha.segundos_resolucao
+
+    return [
+        {
+            "valor": g["valor"],
+            "total": g["total"],
+            "por_status": g["por_status"],
+            "tempo_medio_resolucao_horas": _media_horas(g["segundos"], g["por_status"][StatusEnum.CONCLUIDO.value]),
+        }
+        for g in sorted(grupos.values(), key=lambda g: (-g["total"], g["valor"]))
+    ]
+
+
+ESTATISTICA_CACHE_PREFIX = "estatisticas"
+PERCENTIS = (50, 90, 99)
+
+
+class EstatisticaService:
+    @staticmethod
+    async def get_estatisticas(db: AsyncSession) -> Dict[str, Any]:
+        """
+        Painel de estatísticas lido das tabelas de agregados (contadores e estatísticas por categoria/bairro),
+        que são atualizadas a cada escrita: o custo não depende do número de solicitações.
+        """
+        contadores = await SolicitacaoRepository.count_by_status(db)
+        linhas = await SolicitacaoRepository.list_stats(db)
+        por_categoria = [l for l in linhas if l.dimensao == "categoria"]
+
+        # Cada solicitação aparece uma única vez na dimensão categoria
+        concluidas = sum(l.total for l in por_categoria if l.status == StatusEnum.CONCLUIDO)
+        segundos = sum(l.segundos_resolucao for l in por_categoria)
+        return {
+            "total": sum(contadores.values()),
+            "por_status": {s.value: contadores.get(s, 0) for s in StatusEnum},
+            "tempo_medio_resolucao_horas": _media_horas(segundos, concluidas),
+            "por_categoria": _grupos(por_categoria),
+            "por_bairro": _grupos([l for l in linhas if l.dimensao == "bairro"]),
+        }
+
+    @staticmethod
+    # No namespace que as escritas de status já invalidam: novas transições aparecem na próxima leitura
+    @cached(key_prefix=ESTATISTICA_CACHE_PREFIX, namespace=LIST_CACHE_NAMESPACE)
+    async def get_tempo_em_status(db: AsyncSession, desde: Optional[datetime] = None) -> Dict[str, Any]:
+        """Percentis do tempo em cada status, por categoria e bairro, a partir do histórico de transições"""
+        grupos: Dict[tuple, Dict[str, Any]] = {}
+        for row in await SolicitacaoRepository.time_in_status_percentiles(db, PERCENTIS, desde):
+            grupo = grupos.setdefault((row.dimensao, row.valor, row.status), {
+                "valor": row.valor,
+                "status": row.status.value,
+                "amostras": row.amostras,
+            })
+            # Percentis próximos caem na mesma posição quando há poucas amostras
+            for p in PERCENTIS:
+                if (row.amostras * p + 99) // 100 == row.posicao:
+                    grupo[f"p{p}_horas"] = round(row.segundos / 3600, 2)
+
+        resultado: Dict[str, Any] = {"por_categoria": [], "por_bairro": []}
+        for (dimensao, valor, status), grupo in sorted(grupos.items(), key=lambda g: (g[0][1], g[0][2].value)):
+            resultado[f"por_{dimensao}"].append(grupo)
+        return resultado
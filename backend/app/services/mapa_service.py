@@ -0,0 +1,37 @@
+from typing import Any, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.geo import BoundingBox
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+from app.schemas.solicitacao import SolicitacaoFiltros
+from app.services.solicitacao_service import SolicitacaoService
+
+
+class MapaService:
+    @staticmethod
+    async def list_proximas(
+        db: AsyncSession,
+        latitude: float,
+        longitude: float,
+        raio_m: float,
+        limit: int = 100,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> Dict[str, Any]:
+        proximas = await SolicitacaoRepository.list_near(db, latitude, longitude, raio_m, limit, filtros)
+        return {
+            "solicitacoes": [
+                {**SolicitacaoService._prepare_solicitacao_response(s), "distancia_m": round(distancia, 1)}
+                for s, distancia in proximas
+            ],
+        }
+
+    @staticmethod
+    async def list_area(
+        db: AsyncSession, bbox: BoundingBox, limit: int = 100, filtros: Optional[SolicitacaoFiltros] = None
+    ) -> Dict[str, Any]:
+        # Uma linha a mais só para saber se a área tem mais solicitações que o limite
+        solicitacoes = await SolicitacaoRepository.list_in_bbox(db, bbox, limit + 1, filtros)
+        return {
+            "solicitacoes": [SolicitacaoService._prepare_solicitacao_response(s) for s in solicitacoes[:limit]],
+            "truncado": len(solicitacoes) > limit,
+        }
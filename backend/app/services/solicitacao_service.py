@@ -1,52 +1,303 @@
-from typing import Dict, List, Optional, Any
-from sqlalchemy.orm import Session
+import csv
+import io
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.solicitacao_repository import SolicitacaoRepository
-from app.schemas.solicitacao import SolicitacaoCreate, SolicitacaoUpdate, SolicitacaoResponse
+from app.schemas.solicitacao import (
+    ExportFormato,
+    SolicitacaoBulkStatusUpdate,
+    SolicitacaoBuscaList,
+    SolicitacaoCreate,
+    SolicitacaoFiltros,
+    SolicitacaoList,
+    SolicitacaoParcialList,
+    SolicitacaoResponse,
+    SolicitacaoUpdate,
+    TotalModo,
+)
 from app.models.solicitacao import Solicitacao
-from app.core.cache import cached, delete_cache, clear_cache_pattern
+from app.core.config import settings
+from app.core.cache import cached, delete_cache, invalidate_namespace
+from app.core.etag import version_etag
+from app.core.pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor
+from app.services.cluster_service import ClusterService
 import json
 
 
 SOLICITACAO_CACHE_PREFIX = "solicitacao"
+LIST_CACHE_NAMESPACE = f"{SOLICITACAO_CACHE_PREFIX}:list"
+
+EXPORT_COLUMNS = [
+    "id", "titulo", "descricao", "categoria", "bairro", "latitude", "longitude",
+    "status", "criado_em", "atualizado_em", "fotos_url",
+]
+
+# Campos aceitos em fields= na listagem, na ordem em que aparecem na resposta
+LIST_FIELDS = EXPORT_COLUMNS + ["versao"]
+# Representação compacta da listagem: sem descrição nem fotos
+RESUMO_FIELDS = ("id", "titulo", "categoria", "bairro", "status", "criado_em", "latitude", "longitude")
+
+
+class InvalidFieldsError(ValueError):
+    """Campo desconhecido em fields="""
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """Valida a lista separada por vírgulas e devolve os campos na ordem canônica (chave de cache estável)"""
+    pedidos = {f.strip() for f in fields.split(",") if f.strip()}
+    desconhecidos = pedidos.difference(LIST_FIELDS)
+    if desconhecidos:
+        raise InvalidFieldsError(
+            f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}; aceitos: {', '.join(LIST_FIELDS)}"
+        )
+    if not pedidos:
+        raise InvalidFieldsError("Informe ao menos um campo")
+    return tuple(f for f in LIST_FIELDS if f in pedidos)
+
 
 class SolicitacaoService:
     @staticmethod
-    @cached(key_prefix=SOLICITACAO_CACHE_PREFIX)
-    async def get_solicitacao(db: Session, solicitacao_id: int) -> Optional[Dict[str, Any]]:
-        db_solicitacao = SolicitacaoRepository.get_by_id(db, solicitacao_id)
+    @cached(
+        key_prefix=SOLICITACAO_CACHE_PREFIX,
+        l1=True,
+        key_params=("solicitacao_id",),
+        response_model=SolicitacaoResponse,
+        etag=lambda s: version_etag(s["versao"]),
+        last_modified=lambda s: s["atualizado_em"],
+    )
+    async def get_solicitacao(db: AsyncSession, solicitacao_id: int) -> Optional[Dict[str, Any]]:
+        db_solicitacao = await SolicitacaoRepository.get_by_id(db, solicitacao_id)
         if not db_solicitacao:
             return None
         return SolicitacaoService._prepare_solicitacao_response(db_solicitacao)
     
     @staticmethod
-    @cached(key_prefix=SOLICITACAO_CACHE_PREFIX)
-    async def list_solicitacoes(db: Session, skip: int = 0, limit: int = 100) -> Dict[str, Any]:
-        solicitacoes = SolicitacaoRepository.list_all(db, skip, limit)
-        total = SolicitacaoRepository.get_count(db)
-        
+    async def get_historico(db: AsyncSession, solicitacao_id: int) -> Optional[List[Dict[str, Any]]]:
+        if not await SolicitacaoRepository.get_by_id(db, solicitacao_id):
+            return None
+        return [
+            {"status_anterior": h.status_anterior, "status": h.status, "alterado_em": h.alterado_em}
+            for h in await SolicitacaoRepository.list_historico(db, solicitacao_id)
+        ]
+
+    @staticmethod
+    @cached(
+        key_prefix=SOLICITACAO_CACHE_PREFIX,
+        namespace=LIST_CACHE_NAMESPACE,
+        stale_while_revalidate=settings.CACHE_STALE_WHILE_REVALIDATE,
+        response_model=SolicitacaoList,
+    )
+    async def list_solicitacoes(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filtros: Optional[SolicitacaoFiltros] = None,
+        total_modo: TotalModo = TotalModo.EXACT,
+    ) -> Dict[str, Any]:
+        if cursor is not None:
+            solicitacoes = await SolicitacaoRepository.list_after(db, decode_cursor(cursor), limit, filtros)
+        else:
+            solicitacoes = await SolicitacaoRepository.list_all(db, skip, limit, filtros)
+        total = await SolicitacaoRepository.get_count(db, filtros, total_modo)
+
+        next_cursor = None
+        if len(solicitacoes) == limit:
+            ultima = solicitacoes[-1]
+            next_cursor = encode_cursor(ultima.criado_em, ultima.id)
+
         return {
             "solicitacoes": [SolicitacaoService._prepare_solicitacao_response(s) for s in solicitacoes],
-            "total": total
+            "total": total,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    @cached(
+        key_prefix=SOLICITACAO_CACHE_PREFIX,
+        namespace=LIST_CACHE_NAMESPACE,
+        stale_while_revalidate=settings.CACHE_STALE_WHILE_REVALIDATE,
+        response_model=SolicitacaoParcialList,
+    )
+    async def list_solicitacoes_campos(
+        db: AsyncSession,
+        campos: Tuple[str, ...] = RESUMO_FIELDS,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filtros: Optional[SolicitacaoFiltros] = None,
+        total_modo: TotalModo = TotalModo.EXACT,
+    ) -> Dict[str, Any]:
+        """Listagem com só os campos pedidos, lidos como colunas (sem descrição/fotos quando não pedidas)"""
+        colunas = ["total_fotos" if c == "fotos_url" else c for c in campos]
+        after = decode_cursor(cursor) if cursor is not None else None
+        rows = await SolicitacaoRepository.list_columns(db, colunas, skip, after, limit, filtros)
+        total = await SolicitacaoRepository.get_count(db, filtros, total_modo)
+
+        fotos = {}
+        if "fotos_url" in campos:
+            fotos = await SolicitacaoRepository.fotos_urls(db, [r.id for r in rows if r.total_fotos])
+
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1].criado_em, rows[-1].id)
+
+        return {
+            "solicitacoes": [
+                {c: fotos.get(r.id) if c == "fotos_url" else r._mapping[c] for c in campos} for r in rows
+            ],
+            "total": total,
+            "next_cursor": next_cursor,
         }
     
     @staticmethod
-    async def create_solicitacao(db: Session, solicitacao: SolicitacaoCreate) -> Dict[str, Any]:
-        db_solicitacao = SolicitacaoRepository.create(db, solicitacao)
-        clear_cache_pattern(f"{SOLICITACAO_CACHE_PREFIX}:list_solicitacoes*")
+    @cached(
+        key_prefix=SOLICITACAO_CACHE_PREFIX,
+        namespace=LIST_CACHE_NAMESPACE,
+        response_model=SolicitacaoBuscaList,
+    )
+    async def search_solicitacoes(
+        db: AsyncSession,
+        termo: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> Dict[str, Any]:
+        after = decode_rank_cursor(cursor) if cursor is not None else None
+        resultados = await SolicitacaoRepository.search(db, termo, limit, after, filtros)
+
+        next_cursor = None
+        if len(resultados) == limit:
+            ultima, rank = resultados[-1]
+            next_cursor = encode_rank_cursor(rank, ultima.id)
+
+        return {
+            "solicitacoes": [
+                {**SolicitacaoService._prepare_solicitacao_response(s), "relevancia": -rank}
+                for s, rank in resultados
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    async def create_solicitacao(db: AsyncSession, solicitacao: SolicitacaoCreate) -> Dict[str, Any]:
+        db_solicitacao = await SolicitacaoRepository.create(db, solicitacao)
+        await invalidate_namespace(LIST_CACHE_NAMESPACE)
+        await ClusterService.invalidate_tiles([db_solicitacao.geohash])
         return SolicitacaoService._prepare_solicitacao_response(db_solicitacao)
     
     @staticmethod
-    async def update_solicitacao_status(db: Session, solicitacao_id: int, update: SolicitacaoUpdate) -> Optional[Dict[str, Any]]:
-        db_solicitacao = SolicitacaoRepository.update_status(db, solicitacao_id, update)
+    async def update_solicitacao_status(
+        db: AsyncSession, solicitacao_id: int, update: SolicitacaoUpdate, versao: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Atualiza o status; com `versao`, só se a solicitação ainda estiver nela (senão StaleVersionError)"""
+        db_solicitacao = await SolicitacaoRepository.update_status(db, solicitacao_id, update, versao)
         if not db_solicitacao:
             return None
 
-        delete_cache(f"{SOLICITACAO_CACHE_PREFIX}:get_solicitacao:({solicitacao_id},)")
-        clear_cache_pattern(f"{SOLICITACAO_CACHE_PREFIX}:list_solicitacoes*")
+        await delete_cache(await SolicitacaoService.get_solicitacao.cache_key(db, solicitacao_id))
+        await invalidate_namespace(LIST_CACHE_NAMESPACE)
+        await ClusterService.invalidate_tiles([db_solicitacao.geohash])
         
         return SolicitacaoService._prepare_solicitacao_response(db_solicitacao)
     
+    @staticmethod
+    async def bulk_create_solicitacoes(db: AsyncSession, itens: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Valida cada item do lote, insere os válidos de uma vez e informa os erros por posição"""
+        validas: List[SolicitacaoCreate] = []
+        erros = []
+        for indice, item in enumerate(itens):
+            try:
+                validas.append(SolicitacaoCreate.model_validate(item))
+            except ValidationError as e:
+                erros.append({"indice": indice, "detalhes": SolicitacaoService._validation_details(e)})
+
+        criadas = await SolicitacaoRepository.bulk_create(db, validas)
+        if criadas:
+            await invalidate_namespace(LIST_CACHE_NAMESPACE)
+            await ClusterService.invalidate_tiles(s.geohash for s in criadas)
+
+        return {
+            "solicitacoes": [SolicitacaoService._prepare_solicitacao_response(s) for s in criadas],
+            "erros": erros,
+        }
+
+    @staticmethod
+    async def bulk_update_status(db: AsyncSession, update: SolicitacaoBulkStatusUpdate) -> Dict[str, Any]:
+        ids = list(dict.fromkeys(update.ids))
+        atualizadas = await SolicitacaoRepository.bulk_update_status(db, ids, update.status)
+
+        encontrados = {s.id for s in atualizadas}
+        erros = [
+            {"indice": indice, "id": solicitacao_id, "detalhes": [{"type": "not_found", "msg": "Solicitação não encontrada"}]}
+            for indice, solicitacao_id in enumerate(update.ids)
+            if solicitacao_id not in encontrados
+        ]
+
+        if atualizadas:
+            keys = [await SolicitacaoService.get_solicitacao.cache_key(db, s.id) for s in atualizadas]
+            await delete_cache(*keys)
+            await invalidate_namespace(LIST_CACHE_NAMESPACE)
+            await ClusterService.invalidate_tiles(s.geohash for s in atualizadas)
+
+        por_id = {s.id: s for s in atualizadas}
+        return {
+            "solicitacoes": [SolicitacaoService._prepare_solicitacao_response(por_id[i]) for i in ids if i in por_id],
+            "erros": erros,
+        }
+
+    @staticmethod
+    async def export_solicitacoes(
+        db: AsyncSession,
+        formato: ExportFormato = ExportFormato.NDJSON,
+        filtros: Optional[SolicitacaoFiltros] = None,
+    ) -> AsyncIterator[bytes]:
+        """Gera o arquivo de exportação em pedaços, um por lote lido do cursor do banco"""
+        if formato == ExportFormato.CSV:
+            yield SolicitacaoService._csv_chunk([EXPORT_COLUMNS])
+
+        async for rows in SolicitacaoRepository.stream_all(db, filtros, settings.EXPORT_BATCH_SIZE):
+            # Uma consulta de fotos por lote, só para as linhas que têm fotos
+            fotos = await SolicitacaoRepository.fotos_urls(db, [row.id for row in rows if row.total_fotos])
+            if formato == ExportFormato.CSV:
+                yield SolicitacaoService._csv_chunk(
+                    [SolicitacaoService._export_value(row, c, fotos) for c in EXPORT_COLUMNS] for row in rows
+                )
+            else:
+                yield "".join(
+                    json.dumps(
+                        {c: SolicitacaoService._export_value(row, c, fotos) for c in EXPORT_COLUMNS},
+                        ensure_ascii=False,
+                    ) + "\n"
+                    for row in rows
+                ).encode()
+
+    @staticmethod
+    def _export_value(row: Any, column: str, fotos: Dict[int, List[str]]) -> Any:
+        if column == "fotos_url":
+            return fotos.get(row.id) or None
+        value = getattr(row, column)
+        if column == "status" and value is not None:
+            return value.value
+        if column in ("criado_em", "atualizado_em") and value is not None:
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _csv_chunk(rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # No CSV, a lista de fotos vira uma célula com as URLs separadas por espaço
+            writer.writerow(" ".join(v) if isinstance(v, list) else v for v in row)
+        return buffer.getvalue().encode()
+
+    @staticmethod
+    def _validation_details(error: ValidationError) -> List[Dict[str, Any]]:
+        return [{"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in error.errors()]
+
     @staticmethod
     def _prepare_solicitacao_response(solicitacao: Solicitacao) -> Dict[str, Any]:
         """Convert the Solicitacao model to a dict and handle the JSON fields"""
@@ -61,6 +312,7 @@ class SolicitacaoService:
             "status": solicitacao.status,
             "criado_em": solicitacao.criado_em,
             "atualizado_em": solicitacao.atualizado_em,
-            "fotos_url": json.loads(solicitacao.fotos_url) if solicitacao.fotos_url else None,
+            "fotos_url": [f.url for f in solicitacao.fotos] if solicitacao.total_fotos else None,
+            "versao": solicitacao.versao,
         }
         return result
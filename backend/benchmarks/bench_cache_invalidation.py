@@ -0,0 +1,76 @@
+"""
+Latência do caminho de escrita ao invalidar as páginas de listagem em cache.
+
+Compara a limpeza por SCAN + DELETE (clear_cache_pattern) com a troca de geração do namespace
+(invalidate_namespace) quando há `--keys` entradas de listagem no Redis. O banco indicado em
+--redis-url é esvaziado (FLUSHDB) a cada rodada: use um índice dedicado.
+
+Uso:
+    python benchmarks/bench_cache_invalidation.py --redis-url redis://localhost:6379/15 --keys 100000
+    python benchmarks/bench_cache_invalidation.py --fake   # fakeredis, sem servidor
+"""
+import argparse
+import asyncio
+import time
+from statistics import median
+
+import common  # noqa: F401  (ajusta o sys.path)
+import redis.asyncio as aioredis
+
+from app.core import cache
+
+
+NAMESPACE = "bench:list"
+PATTERN = "bench:list_solicitacoes*"
+
+
+async def populate(client, keys: int, version: int) -> None:
+    payload = "x" * 2_000
+    async with client.pipeline(transaction=False) as pipe:
+        for i in range(keys):
+            pipe.set(f"bench:list_solicitacoes:v{version}:{i}", payload, ex=3600)
+            if i % 5_000 == 4_999:
+                await pipe.execute()
+        await pipe.execute()
+
+
+async def run(args):
+    if args.fake:
+        from fakeredis import aioredis as fakeredis
+        client = fakeredis.FakeRedis()
+    else:
+        client = aioredis.from_url(args.redis_url)
+    cache.redis_client = client
+
+    scan_ms, version_ms = [], []
+    for _ in range(args.repeat):
+        await client.flushdb()
+        await populate(client, args.keys, 0)
+        started = time.perf_counter()
+        await cache.clear_cache_pattern(PATTERN)
+        scan_ms.append((time.perf_counter() - started) * 1000)
+
+        await client.flushdb()
+        await populate(client, args.keys, await cache.get_namespace_version(NAMESPACE))
+        started = time.perf_counter()
+        await cache.invalidate_namespace(NAMESPACE)
+        version_ms.append((time.perf_counter() - started) * 1000)
+
+    await client.flushdb()
+    print(f"{args.keys} chaves de listagem em cache")
+    print(f"SCAN + DELETE (clear_cache_pattern): {median(scan_ms):10.2f} ms")
+    print(f"INCR de geração (invalidate_namespace): {median(version_ms):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--fake", action="store_true", help="Usa fakeredis em vez de um servidor Redis")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
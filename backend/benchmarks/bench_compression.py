@@ -0,0 +1,52 @@
+"""
+Banda e CPU por requisição de uma página de 100 solicitações, com e sem compressão.
+
+Para cada codificação disponível (gzip e, com a biblioteca brotli, br) compara comprimir o corpo a
+cada requisição, como faz o CompressionMiddleware, com servir a versão pré-comprimida guardada na
+entrada do cache. Não usa banco nem Redis.
+
+    python benchmarks/bench_compression.py --iterations 1000
+"""
+import argparse
+
+from common import measure
+from bench_serialization import make_page
+
+from app.core.cache import pack_response, unpack_response
+from app.core.compression import CODECS
+from app.schemas.solicitacao import SolicitacaoList
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = SolicitacaoList.model_validate(make_page(args.page_size)).model_dump_json().encode()
+
+    def per_request(fn) -> float:
+        def run():
+            for _ in range(args.iterations):
+                fn()
+        return measure(run, args.repeat) * 1000 / args.iterations
+
+    print(f"Página com {args.page_size} itens (mediana de {args.repeat}):")
+    print(f"{'codificação':<14}{'bytes':>8}{'razão':>8}{'µs comprimindo':>17}{'µs pré-comprimido':>20}")
+    print(f"{'identity':<14}{len(body):>8}{1:>8.2f}{'-':>17}{'-':>20}")
+    for name, codec in CODECS.items():
+        try:
+            compress, _ = codec()
+        except ImportError:
+            print(f"{name:<14}{'(não instalado)':>20}")
+            continue
+        compressed = compress(body)
+        entry = pack_response({"t": 0}, body, {name: compressed})
+        dynamic_us = per_request(lambda: compress(body))
+        cached_us = per_request(lambda: unpack_response(entry)[2][name])
+        print(f"{name:<14}{len(compressed):>8}{len(body) / len(compressed):>8.2f}{dynamic_us:>17.1f}{cached_us:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Exportação completa (NDJSON e CSV) a partir do cursor do banco: vazão e pico de memória do processo.
+
+Uso:
+    python benchmarks/bench_export.py --database-url sqlite:///./bench.db --rows 1000000
+"""
+import argparse
+import asyncio
+import resource
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import make_async_engine, make_engine, seed
+from app.schemas.solicitacao import ExportFormato
+from app.services.solicitacao_service import SolicitacaoService
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run(args):
+    engine = make_async_engine(args.database_url)
+    print(f"{'formato':<8}{'linhas':>10}{'MB':>10}{'s':>8}{'linhas/s':>12}{'pico RSS (MB)':>16}")
+    for formato in ExportFormato:
+        rows = 0
+        size = 0
+        started = time.perf_counter()
+        async with AsyncSession(engine) as db:
+            async for chunk in SolicitacaoService.export_solicitacoes(db, formato):
+                rows += chunk.count(b"\n")
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"{formato.value:<8}{rows:>10}{size / 1e6:>10.1f}{elapsed:>8.1f}{rows / elapsed:>12.0f}{max_rss_mb():>16.1f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    seed(make_engine(args.database_url), args.rows)
+    print(f"Pico de RSS após a carga: {max_rss_mb():.1f} MB")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Consultas "perto de mim" e por área do mapa: pré-filtro pelo índice de geohash vs. varredura das coordenadas.
+
+Uso:
+    python benchmarks/bench_geo.py --database-url sqlite:///./bench_geo.db --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import make_async_engine, make_engine, measure_async, seed
+from app.core.geo import bbox_around, haversine_m
+from app.models.solicitacao import Solicitacao
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+
+async def near_without_index(db: AsyncSession, lat: float, lon: float, raio_m: float, limit: int):
+    """Mesma consulta sem o geohash: entidades inteiras filtradas só pelas colunas de latitude/longitude"""
+    bbox = bbox_around(lat, lon, raio_m)
+    result = await db.execute(select(Solicitacao).where(
+        Solicitacao.latitude.between(bbox.min_lat, bbox.max_lat),
+        Solicitacao.longitude.between(bbox.min_lon, bbox.max_lon),
+    ))
+    return sorted(
+        d for s in result.scalars() if (d := haversine_m(lat, lon, s.latitude, s.longitude)) <= raio_m
+    )[:limit]
+
+
+async def run(args):
+    engine = make_async_engine(args.database_url)
+    rng = random.Random(1)
+    pontos = [(-22.9 + rng.uniform(-0.15, 0.15), -43.2 + rng.uniform(-0.25, 0.25)) for _ in range(args.queries)]
+
+    print(f"{'raio (m)':>10} {'resultados':>11} {'geohash (ms)':>13} {'varredura (ms)':>15}")
+    async with AsyncSession(engine) as db:
+        for raio in (250, 1_000, 5_000):
+            encontrados = 0
+
+            async def com_indice():
+                nonlocal encontrados
+                encontrados = 0
+                for lat, lon in pontos:
+                    encontrados += len(await SolicitacaoRepository.list_near(db, lat, lon, raio, limit=args.limit))
+                    db.expunge_all()
+
+            async def sem_indice():
+                for lat, lon in pontos:
+                    await near_without_index(db, lat, lon, raio, args.limit)
+                    db.expunge_all()
+
+            indexed_ms = await measure_async(com_indice, args.repeat) / len(pontos)
+            scan_ms = await measure_async(sem_indice, 1) / len(pontos)
+            print(f"{raio:>10} {encontrados / len(pontos):>11.0f} {indexed_ms:>13.2f} {scan_ms:>15.2f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_geo.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=100, help="limit do /mapa/proximas (padrão da API: 100)")
+    args = parser.parse_args()
+
+    seed(make_engine(args.database_url), args.rows)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Custo de servir uma página de 100 solicitações a partir do cache.
+
+Compara o caminho antigo (json + validação pelo response_model + renderização do JSONResponse a
+cada acerto) com cada serializador e com o caminho rápido, que guarda os bytes finais da resposta.
+Não usa banco nem Redis: mede apenas CPU por acerto de cache.
+
+    python benchmarks/bench_serialization.py --iterations 2000
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from common import BAIRROS, CATEGORIAS, PALAVRAS, measure
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.cache import CachedResponse, SERIALIZERS, pack_response, unpack_response
+from app.models.solicitacao import StatusEnum
+from app.schemas.solicitacao import SolicitacaoList
+
+
+def make_page(size: int) -> dict:
+    rng = random.Random(42)
+    inicio = datetime(2024, 1, 1)
+    return {
+        "solicitacoes": [
+            {
+                "id": i,
+                "titulo": f"Solicitação {i}",
+                "descricao": " ".join(rng.choices(PALAVRAS, k=12)),
+                "categoria": rng.choice(CATEGORIAS),
+                "bairro": rng.choice(BAIRROS),
+                "latitude": -22.9 + rng.uniform(-0.2, 0.2),
+                "longitude": -43.2 + rng.uniform(-0.3, 0.3),
+                "status": rng.choice(list(StatusEnum)),
+                "criado_em": inicio + timedelta(minutes=i),
+                "atualizado_em": inicio + timedelta(minutes=i),
+                "fotos_url": [f"http://example.com/{i}.jpg"],
+                "versao": 1,
+            }
+            for i in range(size)
+        ],
+        "total": 10_000,
+        "next_cursor": "WyIyMDI0LTAxLTAxVDAxOjM5OjAwIiw5OV0",
+    }
+
+
+def render_with_validation(data: dict) -> bytes:
+    """O que o FastAPI faz quando a rota retorna um dict com response_model"""
+    content = jsonable_encoder(SolicitacaoList.model_validate(data).model_dump(mode="json"))
+    return JSONResponse(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    page = make_page(args.page_size)
+
+    def per_hit(fn) -> float:
+        def run():
+            for _ in range(args.iterations):
+                fn()
+        return measure(run, args.repeat) * 1000 / args.iterations
+
+    print(f"Página com {args.page_size} itens, microssegundos por acerto de cache (mediana de {args.repeat}):")
+    print(f"{'caminho':<34}{'bytes':>8}{'µs/acerto':>12}")
+
+    legacy = json.dumps(page, default=str)
+    legacy_us = per_hit(lambda: render_with_validation(json.loads(legacy)))
+    print(f"{'json default=str + validação':<34}{len(legacy):>8}{legacy_us:>12.1f}")
+
+    for name in SERIALIZERS:
+        try:
+            dumps, loads = SERIALIZERS[name]()
+        except ImportError:
+            print(f"{name + ' + validação':<34}{'(não instalado)':>20}")
+            continue
+        raw = dumps(page)
+        elapsed = per_hit(lambda: render_with_validation(loads(raw)))
+        print(f"{name + ' + validação':<34}{len(raw):>8}{elapsed:>12.1f}")
+
+    body = SolicitacaoList.model_validate(page).model_dump_json().encode()
+    entry = pack_response({"t": 0}, body)
+    assert json.loads(render_with_validation(page)) == json.loads(body)
+    fast_us = per_hit(lambda: CachedResponse(unpack_response(entry)[1]))
+    print(f"{'bytes da resposta (sem validação)':<34}{len(entry):>8}{fast_us:>12.1f}")
+    print(f"Ganho do caminho rápido sobre o antigo: {legacy_us / fast_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
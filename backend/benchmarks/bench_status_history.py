@@ -0,0 +1,94 @@
+"""
+Percentis de tempo em status: funções de janela no banco vs. carregar as transições e calcular em Python.
+
+Uso:
+    python benchmarks/bench_status_history.py --database-url sqlite:///./bench_historico.db --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import make_async_engine, make_engine, measure_async, seed
+from app.models.solicitacao import Solicitacao, SolicitacaoHistorico, StatusEnum
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+from app.services.estatistica_service import PERCENTIS
+
+
+def seed_historico(engine, batch_size: int = 10_000) -> None:
+    """Duas transições (pendente → em andamento → concluído) por solicitação"""
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(SolicitacaoHistorico)).scalar_one():
+            print("Histórico já populado, reaproveitando.")
+            return
+
+    rng = random.Random(7)
+    print("Populando o histórico de status...")
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        rows = conn.execute(select(Solicitacao.id, Solicitacao.criado_em).execution_options(yield_per=batch_size))
+        for partition in rows.partitions():
+            batch = []
+            for solicitacao_id, criado_em in partition:
+                andamento = criado_em + timedelta(hours=rng.expovariate(1 / 24))
+                concluido = andamento + timedelta(hours=rng.expovariate(1 / 72))
+                batch.append({"solicitacao_id": solicitacao_id, "status_anterior": StatusEnum.PENDENTE,
+                              "status": StatusEnum.EM_ANDAMENTO, "alterado_em": andamento})
+                batch.append({"solicitacao_id": solicitacao_id, "status_anterior": StatusEnum.EM_ANDAMENTO,
+                              "status": StatusEnum.CONCLUIDO, "alterado_em": concluido})
+            conn.execute(insert(SolicitacaoHistorico), batch)
+    print(f"Histórico concluído em {time.perf_counter() - started:.1f}s")
+
+
+async def percentis_em_python(db: AsyncSession):
+    """Abordagem ingênua: traz todas as transições e calcula duração e percentis linha a linha"""
+    result = await db.stream(
+        select(SolicitacaoHistorico.solicitacao_id, SolicitacaoHistorico.status_anterior,
+               SolicitacaoHistorico.alterado_em, Solicitacao.categoria, Solicitacao.bairro, Solicitacao.criado_em)
+        .join(Solicitacao, Solicitacao.id == SolicitacaoHistorico.solicitacao_id)
+        .order_by(SolicitacaoHistorico.solicitacao_id, SolicitacaoHistorico.alterado_em)
+    )
+    duracoes = defaultdict(list)
+    anterior = (None, None)
+    async for solicitacao_id, status, alterado_em, categoria, bairro, criado_em in result:
+        inicio = anterior[1] if anterior[0] == solicitacao_id else criado_em
+        segundos = (alterado_em - inicio).total_seconds()
+        duracoes[("categoria", categoria, status)].append(segundos)
+        duracoes[("bairro", bairro, status)].append(segundos)
+        anterior = (solicitacao_id, alterado_em)
+    return {
+        grupo: [sorted(valores)[(len(valores) * p + 99) // 100 - 1] for p in PERCENTIS]
+        for grupo, valores in duracoes.items()
+    }
+
+
+async def run(args):
+    engine = make_async_engine(args.database_url)
+    async with AsyncSession(engine) as db:
+        sql_ms = await measure_async(lambda: SolicitacaoRepository.time_in_status_percentiles(db, PERCENTIS), args.repeat)
+        python_ms = await measure_async(lambda: percentis_em_python(db), 1)
+    print(f"{'funções de janela (ms)':>24}{'Python (ms)':>14}")
+    print(f"{sql_ms:>24.0f}{python_ms:>14.0f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_historico.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    seed(engine, args.rows)
+    seed_historico(engine)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Awaitable, Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.database import Base, to_async_url
+from app.models.solicitacao import Solicitacao, StatusEnum
+
+
+CATEGORIAS = ["Pavimentação", "Iluminação", "Limpeza", "Saneamento", "Poda de árvore", "Sinalização"]
+BAIRROS = ["Centro", "Copacabana", "Tijuca", "Botafogo", "Méier", "Barra", "Madureira", "Lapa"]
+PALAVRAS = ["buraco", "rua", "poste", "lâmpada", "lixo", "calçada", "árvore", "esgoto", "vazamento", "semáforo"]
+
+
+def make_engine(database_url: str) -> Engine:
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    return create_engine(database_url, connect_args=connect_args)
+
+
+def make_async_engine(database_url: str) -> AsyncEngine:
+    return create_async_engine(to_async_url(database_url))
+
+
+def seed(engine: Engine, rows: int, batch_size: int = 10_000) -> None:
+    """Cria o schema e popula a tabela até ter `rows` solicitações"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(Solicitacao)).scalar_one()
+    if existing >= rows:
+        print(f"Tabela já possui {existing} linhas, reaproveitando.")
+        return
+
+    rng = random.Random(42)
+    inicio = datetime(2020, 1, 1)
+    statuses = list(StatusEnum)
+    print(f"Populando {rows - existing} linhas...")
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(existing, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                criado_em = inicio + timedelta(seconds=i * 30)
+                batch.append({
+                    "titulo": f"Solicitação {i}",
+                    "descricao": " ".join(rng.choices(PALAVRAS, k=12)),
+                    "categoria": rng.choice(CATEGORIAS),
+                    "bairro": rng.choice(BAIRROS),
+                    "latitude": -22.9 + rng.uniform(-0.2, 0.2),
+                    "longitude": -43.2 + rng.uniform(-0.3, 0.3),
+                    "status": rng.choice(statuses),
+                    "criado_em": criado_em,
+                    "atualizado_em": criado_em,
+                })
+            conn.execute(insert(Solicitacao), batch)
+    print(f"Carga concluída em {time.perf_counter() - started:.1f}s")
+
+
+def measure(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Mediana em milissegundos de `repeat` execuções"""
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return median(timings)
+
+
+async def measure_async(fn: Callable[[], Awaitable[object]], repeat: int = 5) -> float:
+    """Mediana em milissegundos de `repeat` execuções de uma corrotina"""
+    timings: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return median(timings)
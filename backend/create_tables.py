@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 
@@ -8,6 +9,8 @@ from app.core.database import init_db
 from app.models.solicitacao import Solicitacao, StatusEnum
 
 def main():
+    """Passo explícito de migração: rode antes de subir o app (o startup dos workers não cria o schema)"""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     print("Criando tabelas no banco de dados...")
     try:
         init_db()
@@ -0,0 +1,10 @@
+#!/bin/sh
+# Passo de migração antes do app: cria/atualiza o schema (idempotente) e então executa o comando do
+# container (gunicorn por padrão). SKIP_MIGRATIONS=true pula o passo quando a migração roda em outro lugar.
+set -e
+
+if [ "${SKIP_MIGRATIONS:-false}" != "true" ]; then
+    python create_tables.py
+fi
+
+exec "$@"
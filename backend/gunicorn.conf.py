@@ -0,0 +1,47 @@
+"""
+Perfil de produção: gunicorn gerenciando N workers uvicorn.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Variáveis de ambiente:
+    PORT                      porta (padrão 8000)
+    WEB_CONCURRENCY           número de workers (padrão: número de CPUs)
+    GUNICORN_PRELOAD          importa o app uma vez no mestre antes do fork (padrão true)
+    GUNICORN_TIMEOUT          segundos sem resposta até o worker ser reiniciado (padrão 60)
+    GUNICORN_GRACEFUL_TIMEOUT segundos para concluir as requisições em andamento ao desligar (padrão 30)
+    GUNICORN_MAX_REQUESTS     recicla o worker após N requisições, com jitter de 10% (0 desliga)
+    LOG_LEVEL                 nível dos logs (padrão info)
+
+O schema não é criado aqui: rode `python create_tables.py` antes (entrypoint da imagem Docker,
+preDeployCommand do railway.toml, release do Procfile). O
+pré-carregamento não compartilha conexões: os engines e o Redis não abrem conexões na importação,
+cada worker abre as suas depois do fork e as fecha ao desligar (ver app/main.py).
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Descarta conexões herdadas do mestre, se alguma tiver sido aberta durante o pré-carregamento"""
+    if not preload_app:
+        return
+    from app.core.database import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
@@ -0,0 +1,78 @@
+"""
+Confere e recalcula os agregados do painel (contadores por status e estatísticas por categoria/bairro).
+
+Uso:
+    python rebuild_stats.py           # mostra as divergências e recalcula tudo a partir das solicitações
+    python rebuild_stats.py --check   # só confere; sai com código 1 se houver divergência
+"""
+import argparse
+import math
+import os
+import sys
+
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import func, select
+
+from app.core.database import engine
+from app.models.solicitacao import Solicitacao, SolicitacaoContador, SolicitacaoEstatistica
+from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+
+def _diferencas(conn) -> list:
+    diferencas = []
+
+    esperado = {status: total for status, total in conn.execute(
+        select(Solicitacao.status, func.count(Solicitacao.id)).group_by(Solicitacao.status)
+    )}
+    atual = {status: total for status, total in conn.execute(
+        select(SolicitacaoContador.status, SolicitacaoContador.total)
+    )}
+    for status in esperado.keys() | atual.keys():
+        if esperado.get(status, 0) != atual.get(status, 0):
+            diferencas.append(f"contador {status.value}: {atual.get(status, 0)} (esperado {esperado.get(status, 0)})")
+
+    esperado = {
+        (row.dimensao, row.valor, row.status): (row.total, row.segundos_resolucao)
+        for query in SolicitacaoRepository.stats_totals_queries(engine.dialect.name)
+        for row in conn.execute(query)
+    }
+    atual = {
+        (row.dimensao, row.valor, row.status): (row.total, row.segundos_resolucao)
+        for row in conn.execute(select(SolicitacaoEstatistica))
+    }
+    for chave in sorted(esperado.keys() | atual.keys(), key=str):
+        total, segundos = atual.get(chave, (0, 0.0))
+        total_esperado, segundos_esperado = esperado.get(chave, (0, 0.0))
+        if total != total_esperado or not math.isclose(segundos, segundos_esperado, rel_tol=1e-6, abs_tol=1.0):
+            dimensao, valor, status = chave
+            diferencas.append(
+                f"{dimensao} {valor!r} {status.value}: total {total} (esperado {total_esperado}), "
+                f"resolução {segundos:.0f}s (esperado {segundos_esperado:.0f}s)"
+            )
+    return diferencas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Só confere, sem recalcular")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        diferencas = _diferencas(conn)
+        for diferenca in diferencas:
+            print(diferenca)
+        if args.check:
+            print("Agregados consistentes." if not diferencas else f"{len(diferencas)} divergência(s) encontrada(s).")
+            sys.exit(1 if diferencas else 0)
+
+        statements = SolicitacaoRepository.rebuild_counters_statements()
+        statements += SolicitacaoRepository.rebuild_stats_statements(engine.dialect.name)
+        for statement in statements:
+            conn.execute(statement)
+    print("Agregados recalculados.")
+
+
+if __name__ == "__main__":
+    main()
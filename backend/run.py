@@ -5,6 +5,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 import uvicorn
+from app.core.config import settings
 from app.core.database import init_db
 from app.models.solicitacao import Solicitacao, StatusEnum
 
@@ -17,4 +18,5 @@ if __name__ == "__main__":
         print(f"Erro ao inicializar o banco de dados: {e}")
 
     print("Iniciando o servidor...")
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # Recarregamento automático só em desenvolvimento; em produção use o gunicorn (gunicorn.conf.py)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.ENVIRONMENT == "development")
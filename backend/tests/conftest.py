@@ -1,42 +1,53 @@
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from app.core import cache
 from app.core.database import Base, get_db
 from app.main import app
 
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+@pytest.fixture(autouse=True)
+def no_real_redis(monkeypatch):
+    # O Redis conecta no primeiro uso; nos testes fica o cache local (os testes de Redis usam o fakeredis)
+    monkeypatch.setattr(cache.settings, "REDIS_CACHE_ENABLED", False)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    cache.local_cache.clear()
+    cache.local_versions.clear()
+    yield
+    cache.local_cache.clear()
+    cache.local_versions.clear()
 
 @pytest.fixture(scope="function")
-def db():
-    Base.metadata.create_all(bind=engine)
+def session_factory(tmp_path):
+    # Banco em arquivo por teste: o TestClient e os testes assíncronos rodam em event loops distintos,
+    # então cada sessão abre sua própria conexão (NullPool) em vez de compartilhar uma em memória.
+    database_path = tmp_path / "test.db"
+    sync_engine = create_engine(f"sqlite:///{database_path}")
+    Base.metadata.create_all(bind=sync_engine)
 
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=sync_engine)
+    sync_engine.dispose()
+
+@pytest_asyncio.fixture(scope="function")
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
 
 @pytest.fixture(scope="function")
-def client(db):
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
-    
+def client(session_factory):
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
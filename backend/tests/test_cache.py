@@ -1,52 +1,151 @@
+import asyncio
+from datetime import datetime
+
 import pytest
-import fakeredis
-import json
-from unittest.mock import patch, MagicMock
+import pytest_asyncio
+from fakeredis import aioredis as fakeredis
+from unittest.mock import patch
 
-from app.core.cache import get_cache, set_cache, delete_cache, clear_cache_pattern, cached
+from app.core import cache
+from app.core.cache import (
+    CACHE_KEY_MAX_LENGTH,
+    CachedResponse,
+    LRUCache,
+    build_cache_key,
+    cached,
+    clear_cache_pattern,
+    delete_cache,
+    get_cache,
+    get_namespace_version,
+    invalidate_namespace,
+    load_serializer,
+    set_cache,
+)
+from app.models.solicitacao import StatusEnum
+from app.schemas.solicitacao import SolicitacaoResponse
 
 
-redis_client = fakeredis.FakeStrictRedis()
+@pytest_asyncio.fixture(scope="function")
+async def mock_redis():
+    redis_client = fakeredis.FakeRedis()
+    with patch('app.core.cache.redis_client', redis_client):
+        yield redis_client
+    await redis_client.flushall()
 
 @pytest.fixture(scope="function")
-def mock_redis():
-    with patch('app.core.cache.redis_client', redis_client):
+def no_redis():
+    with patch('app.core.cache.redis_client', None):
         yield
 
-def test_set_and_get_cache(mock_redis):
+@pytest.mark.asyncio
+async def test_set_and_get_cache(mock_redis):
     key = "test_key"
     value = {"name": "Test", "value": 123}
-    
-    set_cache(key, value)
-    result = get_cache(key)
-    
+
+    await set_cache(key, value)
+    result = await get_cache(key)
+
     assert result == value
 
-def test_delete_cache(mock_redis):
+@pytest.mark.asyncio
+async def test_set_cache_expire(mock_redis):
+    await set_cache("test_expire", "value", expire=60)
+    assert 0 < await mock_redis.ttl("test_expire") <= 60
+
+@pytest.mark.asyncio
+async def test_delete_cache(mock_redis):
     key = "test_delete"
     value = {"name": "Delete me"}
-    
-    set_cache(key, value)
-    assert get_cache(key) == value
-    
-    delete_cache(key)
-    assert get_cache(key) is None
 
-def test_clear_cache_pattern(mock_redis):
-    set_cache("prefix:key1", "value1")
-    set_cache("prefix:key2", "value2")
-    set_cache("other:key3", "value3")
+    await set_cache(key, value)
+    assert await get_cache(key) == value
+
+    await delete_cache(key)
+    assert await get_cache(key) is None
+
+@pytest.mark.asyncio
+async def test_clear_cache_pattern(mock_redis):
+    await set_cache("prefix:key1", "value1")
+    await set_cache("prefix:key2", "value2")
+    await set_cache("other:key3", "value3")
+
+    await clear_cache_pattern("prefix:*")
+
+    assert await get_cache("prefix:key1") is None
+    assert await get_cache("prefix:key2") is None
+    assert await get_cache("other:key3") == "value3"
+
+@pytest.mark.asyncio
+async def test_in_memory_fallback(no_redis):
+    value = {"name": "Fallback", "items": [1, 2, 3]}
+
+    await set_cache("fallback:key", value)
+    assert await get_cache("fallback:key") == value
+
+    await clear_cache_pattern("fallback:*")
+    assert await get_cache("fallback:key") is None
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+
+    lru.set("c", 3)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.stats() == {
+        "size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1, "expirations": 0,
+    }
+
+def test_lru_cache_expires_entries(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now)
+    lru = LRUCache(maxsize=10, ttl=30)
+    lru.set("default_ttl", "a")
+    lru.set("short_ttl", "b", ttl=5)
+    lru.set("no_ttl", "c", ttl=0)
+
+    now += 10
+    assert lru.get("short_ttl") is None
+    assert lru.get("default_ttl") == "a"
+
+    now += 30
+    assert lru.get("default_ttl") is None
+    assert lru.get("no_ttl") == "c"
+    assert lru.stats()["expirations"] == 2
+    assert len(lru) == 1
+
+@pytest.mark.asyncio
+async def test_in_memory_fallback_is_bounded(no_redis, monkeypatch):
+    monkeypatch.setattr(cache, "local_cache", LRUCache(maxsize=3))
+    for i in range(10):
+        await set_cache(f"bounded:{i}", i)
+
+    assert len(cache.local_cache) == 3
+    assert await get_cache("bounded:0") is None
+    assert await get_cache("bounded:9") == 9
+    assert cache.local_cache.evictions == 7
+
+@pytest.mark.asyncio
+async def test_l1_tier_serves_hot_keys_without_redis(mock_redis, monkeypatch):
+    monkeypatch.setattr(cache, "l1_cache", LRUCache(maxsize=10, ttl=5))
+
+    await set_cache("hot:1", {"id": 1}, l1=True)
+    await mock_redis.delete("hot:1")
+    assert await get_cache("hot:1", l1=True) == {"id": 1}
+    assert await get_cache("hot:1") is None
 
-    clear_cache_pattern("prefix:*")
-    
-    assert get_cache("prefix:key1") is None
-    assert get_cache("prefix:key2") is None
-    assert get_cache("other:key3") == "value3"
+    await delete_cache("hot:1")
+    assert await get_cache("hot:1", l1=True) is None
+    assert cache.l1_cache.stats()["hits"] == 1
 
 @pytest.mark.asyncio
 async def test_cached_decorator(mock_redis):
     call_count = 0
-    
+
     @cached(key_prefix="test_decorator")
     async def test_function(param):
         nonlocal call_count
@@ -59,8 +158,297 @@ async def test_cached_decorator(mock_redis):
 
     result2 = await test_function("abc")
     assert result2 == "Result abc"
-    assert call_count == 1 
-    
+    assert call_count == 1
+
     result3 = await test_function("def")
     assert result3 == "Result def"
     assert call_count == 2
+
+async def assert_namespace_invalidation():
+    call_count = 0
+
+    @cached(key_prefix="test_namespace", namespace="test_namespace:list")
+    async def list_items(page):
+        nonlocal call_count
+        call_count += 1
+        return [page, call_count]
+
+    assert await list_items(1) == [1, 1]
+    assert await list_items(2) == [2, 2]
+    assert await list_items(1) == [1, 1]
+
+    await invalidate_namespace("test_namespace:list")
+
+    assert await list_items(1) == [1, 3]
+    assert await list_items(2) == [2, 4]
+    assert call_count == 4
+
+@pytest.mark.asyncio
+async def test_invalidate_namespace(mock_redis):
+    await assert_namespace_invalidation()
+
+@pytest.mark.asyncio
+async def test_invalidate_namespace_in_memory(no_redis):
+    await assert_namespace_invalidation()
+
+@pytest.mark.asyncio
+async def test_namespace_version_survives_key_loss(mock_redis):
+    await set_cache(f"test:v{await get_namespace_version('ns')}:page", "stale")
+    await invalidate_namespace("ns")
+    await mock_redis.delete("cache:version:ns")
+
+    # A nova geração não pode voltar a um número já usado por entradas antigas
+    assert await get_cache(f"test:v{await get_namespace_version('ns')}:page") is None
+
+@pytest.mark.asyncio
+async def test_cache_key_ignores_sessions_and_normalizes_kwargs(db):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app.schemas.solicitacao import SolicitacaoFiltros
+
+    @cached(key_prefix="test_keys")
+    async def list_items(db, skip=0, limit=100, filtros=None):
+        return []
+
+    key = await list_items.cache_key(db, limit=10, filtros=SolicitacaoFiltros(bairro="Centro"))
+    assert key == 'test_keys:list_items:{"filtros":{"bairro":"Centro"},"limit":10,"skip":0}'
+    assert key == await list_items.cache_key(AsyncSession(), filtros=SolicitacaoFiltros(bairro="Centro"), limit=10, skip=0)
+    assert key != await list_items.cache_key(db, limit=10, filtros=SolicitacaoFiltros(bairro="Tijuca"))
+
+@pytest.mark.asyncio
+async def test_cache_key_explicit_params():
+    @cached(key_prefix="test_keys", key_params=("item_id",))
+    async def get_item(client, item_id, verbose=False):
+        return item_id
+
+    assert await get_item.cache_key(object(), 7) == 'test_keys:get_item:{"item_id":7}'
+    assert await get_item.cache_key(object(), item_id=7, verbose=True) == 'test_keys:get_item:{"item_id":7}'
+
+def test_long_cache_keys_are_hashed():
+    key = build_cache_key("test_keys", "search", {"q": "buraco " * 100})
+    assert len(key) <= CACHE_KEY_MAX_LENGTH
+    assert key == build_cache_key("test_keys", "search", {"q": "buraco " * 100})
+    assert key != build_cache_key("test_keys", "search", {"q": "buraco " * 101})
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_misses(no_redis):
+    call_count = 0
+    release = asyncio.Event()
+
+    @cached(key_prefix="test_single_flight")
+    async def slow(param):
+        nonlocal call_count
+        call_count += 1
+        await release.wait()
+        return {"param": param}
+
+    tasks = [asyncio.create_task(slow("x")) for _ in range(20)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [{"param": "x"}] * 20
+    assert call_count == 1
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors(no_redis):
+    call_count = 0
+
+    @cached(key_prefix="test_single_flight_error")
+    async def failing():
+        nonlocal call_count
+        call_count += 1
+        await asyncio.sleep(0)
+        raise ValueError("falhou")
+
+    results = await asyncio.gather(*(failing() for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert call_count == 1
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate(no_redis, monkeypatch):
+    now = 1_000.0
+    monkeypatch.setattr(cache.time, "time", lambda: now)
+    call_count = 0
+
+    @cached(key_prefix="test_swr", expire=60, stale_while_revalidate=30)
+    async def compute():
+        nonlocal call_count
+        call_count += 1
+        return call_count
+
+    assert await compute() == 1
+    now += 70  # expirou, mas dentro da janela de revalidação
+    assert await compute() == 1
+    await asyncio.gather(*cache._background_tasks)
+    assert call_count == 2
+    assert await compute() == 2
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+def test_serializers_round_trip(name):
+    pytest.importorskip(name)
+    dumps, loads = load_serializer(name)
+    value = {"status": StatusEnum.PENDENTE, "criado_em": datetime(2024, 1, 2, 3, 4, 5), "itens": [1, None]}
+
+    raw = dumps(value)
+    assert isinstance(raw, bytes)
+    assert loads(raw) == {"status": "pendente", "criado_em": "2024-01-02T03:04:05", "itens": [1, None]}
+
+@pytest.mark.asyncio
+async def test_cached_response_model_skips_revalidation(mock_redis, monkeypatch):
+    call_count = 0
+    item = {
+        "id": 1, "titulo": "Poste apagado", "descricao": "Sem luz", "categoria": "Iluminação",
+        "bairro": "Centro", "status": StatusEnum.PENDENTE,
+        "criado_em": datetime(2024, 1, 2), "atualizado_em": datetime(2024, 1, 2), "versao": 1,
+    }
+
+    @cached(key_prefix="test_response", response_model=SolicitacaoResponse)
+    async def get_item(item_id):
+        nonlocal call_count
+        call_count += 1
+        return item if item_id == 1 else None
+
+    first = await get_item(1)
+    assert isinstance(first, CachedResponse)
+
+    validations = 0
+    original = SolicitacaoResponse.model_validate.__func__
+    def counting_validate(cls, *args, **kwargs):
+        nonlocal validations
+        validations += 1
+        return original(cls, *args, **kwargs)
+    monkeypatch.setattr(SolicitacaoResponse, "model_validate", classmethod(counting_validate))
+
+    second = await get_item(1)
+    assert second.body == first.body
+    assert second.media_type == "application/json"
+    assert call_count == 1
+    assert validations == 0
+    assert SolicitacaoResponse.model_validate_json(second.body).titulo == "Poste apagado"
+
+    assert await get_item(2) is None
+
+def test_responses_are_compressed_above_threshold(client, monkeypatch):
+    from app.core import compression
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_SIZE", 1024)
+    base = {"descricao": "Descrição longa " * 20, "categoria": "Teste", "bairro": "Centro"}
+    for i in range(10):
+        client.post("/api/solicitacoes/", json={**base, "titulo": f"Compressão {i}"})
+
+    listagem = client.get("/api/solicitacoes/", headers={"Accept-Encoding": "gzip"})
+    assert listagem.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in listagem.headers["vary"]
+    assert int(listagem.headers["content-length"]) < len(listagem.content) / 2
+    assert len(listagem.json()["solicitacoes"]) == 10
+
+    # Sem suporte do cliente, abaixo do mínimo ou fora da lista de content-types: sem compressão
+    assert "content-encoding" not in client.get("/api/solicitacoes/", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/health", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get(
+        "/api/solicitacoes/", headers={"Accept-Encoding": "gzip;q=0, br;q=0"}
+    ).headers
+
+    # Streaming: comprimido pedaço a pedaço, sem Content-Length
+    export = client.get("/api/solicitacoes/export?formato=ndjson", headers={"Accept-Encoding": "gzip"})
+    assert export.headers["content-encoding"] == "gzip"
+    assert "content-length" not in export.headers
+    assert len(export.text.splitlines()) == 10
+
+def test_cached_responses_reuse_precompressed_bytes(client, monkeypatch):
+    from app.core import compression
+    compress, stream = compression._codecs["gzip"]
+    calls = 0
+    def counting_compress(body):
+        nonlocal calls
+        calls += 1
+        return compress(body)
+    monkeypatch.setitem(compression._codecs, "gzip", (counting_compress, stream))
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_SIZE", 1024)
+
+    base = {"descricao": "Descrição longa " * 100, "categoria": "Teste", "bairro": "Centro"}
+    solicitacao_id = client.post("/api/solicitacoes/", json={**base, "titulo": "Detalhe"}).json()["id"]
+    calls = 0
+
+    responses = [
+        client.get(f"/api/solicitacoes/{solicitacao_id}", headers={"Accept-Encoding": "gzip"}) for _ in range(3)
+    ]
+    assert calls == 1
+    assert all(r.headers["content-encoding"] == "gzip" for r in responses)
+    assert responses[0].json() == responses[2].json()
+    assert responses[0].headers["etag"] == responses[2].headers["etag"]
+
+    plain = client.get(f"/api/solicitacoes/{solicitacao_id}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == responses[0].json()
+    assert calls == 1
+
+    # Cada codificação tem a sua ETag forte; o 304 leva a da codificação escolhida e o Vary
+    assert plain.headers["etag"] == '"1"'
+    assert responses[0].headers["etag"] == '"1-gzip"'
+    assert "accept-encoding" in responses[0].headers["vary"].lower()
+    not_modified = client.get(
+        f"/api/solicitacoes/{solicitacao_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": '"1-gzip"'}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == '"1-gzip"'
+    assert "accept-encoding" in not_modified.headers["vary"].lower()
+    assert client.get(
+        f"/api/solicitacoes/{solicitacao_id}", headers={"Accept-Encoding": "identity", "If-None-Match": '"1-gzip"'}
+    ).status_code == 200
+
+    # O If-Match aceita a ETag de qualquer codificação da mesma versão
+    response = client.patch(
+        f"/api/solicitacoes/{solicitacao_id}", json={"status": "em_andamento"}, headers={"If-Match": '"1-gzip"'}
+    )
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_close_cache_drains_background_revalidations(no_redis):
+    concluidas = []
+
+    async def revalidacao():
+        await asyncio.sleep(0.05)
+        concluidas.append(True)
+
+    task = asyncio.create_task(revalidacao())
+    cache._background_tasks.add(task)
+    task.add_done_callback(cache._background_tasks.discard)
+
+    await cache.close_cache()
+    assert concluidas == [True]
+    assert not cache._background_tasks
+
+@pytest.mark.asyncio
+async def test_redis_connects_lazily_once(monkeypatch):
+    fake = fakeredis.FakeRedis()
+    conexoes = 0
+
+    async def connect():
+        nonlocal conexoes
+        conexoes += 1
+        await asyncio.sleep(0.01)
+        cache.redis_client = fake
+
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache.settings, "REDIS_CACHE_ENABLED", True)
+    monkeypatch.setattr(cache, "_connect_redis", connect)
+
+    clientes = await asyncio.gather(*[cache.get_redis() for _ in range(5)])
+    assert clientes == [fake] * 5
+    assert conexoes == 1
+    assert await cache.get_redis() is fake
+    assert conexoes == 1
+
+@pytest.mark.asyncio
+async def test_redis_unavailable_falls_back_to_local_cache(monkeypatch):
+    import time
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache, "_redis_retry_at", 0.0)
+    monkeypatch.setattr(cache.settings, "REDIS_CACHE_ENABLED", True)
+    monkeypatch.setattr(cache.settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+
+    assert await cache.get_redis() is None
+    assert cache._redis_retry_at > time.monotonic()
+    assert cache.redis_pool is None
+
+    await set_cache("chave", {"valor": 1})
+    assert await get_cache("chave") == {"valor": 1}
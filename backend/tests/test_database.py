@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedNullPool, pool_stats, pool_status, warm_pool
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_tracks_checkouts_and_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    pool_stats.reset()
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            status = pool_status(engine.pool)
+            assert status["checked_out"] == 1
+            assert status["size"] == 1
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        status = pool_status(engine.pool)
+        assert status["pool"] == "InstrumentedAsyncQueuePool"
+        assert status["checked_out"] == 0
+        assert status["acquisitions"] == 1
+        assert status["timeouts"] == 1
+        assert status["waiting"] == 0
+    finally:
+        await engine.dispose()
+        pool_stats.reset()
+
+@pytest.mark.asyncio
+async def test_warm_pool_opens_connections_up_front(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+    engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, pool_size=3, max_overflow=0)
+    sem_fila = create_async_engine(url, poolclass=InstrumentedNullPool)
+    try:
+        assert await warm_pool(engine, 2) == 2
+        assert engine.pool.checkedin() == 2
+        assert engine.pool.checkedout() == 0
+        # Limitado ao tamanho do pool
+        assert await warm_pool(engine, 10) == 3
+        assert await warm_pool(sem_fila, 2) == 0
+    finally:
+        await engine.dispose()
+        await sem_fila.dispose()
+        pool_stats.reset()
+
+def test_admin_pool_endpoint(client, monkeypatch):
+    from app.core.config import settings
+
+    # Sem ADMIN_TOKEN configurado os diagnósticos não existem
+    assert client.get("/api/admin/pool").status_code == 404
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "segredo")
+    assert client.get("/api/admin/pool").status_code == 401
+    assert client.get("/api/admin/cache", headers={"X-Admin-Token": "outro"}).status_code == 401
+    assert client.get("/api/admin/cache", headers={"X-Admin-Token": "segredo"}).status_code == 200
+
+    response = client.get("/api/admin/pool", headers={"X-Admin-Token": "segredo"})
+    assert response.status_code == 200
+
+    data = response.json()
+    for field in ("pool", "pre_ping", "acquisitions", "waiting", "timeouts", "wait_avg_ms", "wait_max_ms"):
+        assert field in data
+
+def test_migrate_fotos_url_moves_json_into_child_table(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from app.core import database
+    from app.core.database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legado.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE solicitacoes ADD COLUMN fotos_url TEXT")
+        for solicitacao_id, fotos_url in ((1, '["a.jpg", "b.jpg"]'), (2, None), (3, "inválido")):
+            conn.execute(
+                text(
+                    "INSERT INTO solicitacoes (id, titulo, descricao, categoria, bairro, status, versao, total_fotos, "
+                    "fotos_url) VALUES (:id, 'Legado', 'Teste', 'Limpeza', 'Centro', 'PENDENTE', 1, 0, :fotos)"
+                ),
+                {"id": solicitacao_id, "fotos": fotos_url},
+            )
+    monkeypatch.setattr(database, "engine", engine)
+
+    database._migrate_fotos_url(batch_size=2)
+    database._migrate_fotos_url(batch_size=2)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, total_fotos, fotos_url FROM solicitacoes ORDER BY id")).all() == [
+            (1, 2, None), (2, 0, None), (3, 0, None),
+        ]
+        assert conn.execute(text("SELECT solicitacao_id, ordem, url FROM solicitacao_fotos ORDER BY id")).all() == [
+            (1, 0, "a.jpg"), (1, 1, "b.jpg"),
+        ]
+    engine.dispose()
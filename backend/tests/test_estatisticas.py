@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.solicitacao import SolicitacaoEstatistica, StatusEnum
+
+
+def criar(client, titulo, categoria, bairro):
+    return client.post("/api/solicitacoes/", json={
+        "titulo": titulo, "descricao": "Teste", "categoria": categoria, "bairro": bairro,
+    }).json()["id"]
+
+def test_estatisticas_follow_creates_and_status_changes(client):
+    ids = [criar(client, f"Buraco {i}", "Buracos", "Centro") for i in range(3)]
+    ids.append(criar(client, "Poste apagado", "Iluminação", "Lapa"))
+    client.post("/api/solicitacoes/bulk", json=[
+        {"titulo": "Lixo", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Lapa"},
+        {"titulo": "Entulho", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro"},
+    ])
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.CONCLUIDO})
+    client.patch(f"/api/solicitacoes/{ids[1]}", json={"status": StatusEnum.EM_ANDAMENTO})
+    client.patch("/api/solicitacoes/bulk-status", json={"ids": [ids[1], ids[3]], "status": StatusEnum.CONCLUIDO})
+    # Reaberta: sai das concluídas e perde o tempo de resolução
+    client.patch(f"/api/solicitacoes/{ids[3]}", json={"status": StatusEnum.PENDENTE})
+
+    response = client.get("/api/estatisticas")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 6
+    assert data["por_status"] == {"pendente": 4, "em_andamento": 0, "concluido": 2}
+    assert data["tempo_medio_resolucao_horas"] == pytest.approx(0, abs=0.01)
+
+    por_categoria = {g["valor"]: g for g in data["por_categoria"]}
+    assert [g["valor"] for g in data["por_categoria"]] == ["Buracos", "Limpeza", "Iluminação"]
+    assert por_categoria["Buracos"]["por_status"] == {"pendente": 1, "em_andamento": 0, "concluido": 2}
+    assert por_categoria["Buracos"]["tempo_medio_resolucao_horas"] is not None
+    assert por_categoria["Iluminação"]["por_status"]["pendente"] == 1
+    assert por_categoria["Iluminação"]["tempo_medio_resolucao_horas"] is None
+
+    por_bairro = {g["valor"]: g["total"] for g in data["por_bairro"]}
+    assert por_bairro == {"Centro": 4, "Lapa": 2}
+
+@pytest.mark.asyncio
+async def test_rebuild_stats_matches_maintained_stats(client, db):
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    ids = [criar(client, f"Buraco {i}", "Buracos", f"Bairro {i % 2}") for i in range(4)]
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.CONCLUIDO})
+    client.patch("/api/solicitacoes/bulk-status", json={"ids": ids[:3], "status": StatusEnum.CONCLUIDO})
+    client.patch(f"/api/solicitacoes/{ids[2]}", json={"status": StatusEnum.EM_ANDAMENTO})
+
+    def snapshot(linhas):
+        return {(l.dimensao, l.valor, l.status): (l.total, l.segundos_resolucao) for l in linhas if l.total}
+
+    maintained = snapshot((await db.scalars(select(SolicitacaoEstatistica))).all())
+    for statement in SolicitacaoRepository.rebuild_stats_statements("sqlite"):
+        await db.execute(statement)
+    await db.commit()
+    db.expire_all()
+    rebuilt = snapshot((await db.scalars(select(SolicitacaoEstatistica))).all())
+
+    assert rebuilt == {chave: (total, pytest.approx(segundos, abs=0.01)) for chave, (total, segundos) in maintained.items()}
+    assert maintained[("categoria", "Buracos", StatusEnum.CONCLUIDO)][0] == 2
+    assert maintained[("bairro", "Bairro 0", StatusEnum.EM_ANDAMENTO)][0] == 1
+
+@pytest.mark.asyncio
+async def test_historico_and_time_in_status_percentiles(client, db):
+    from datetime import datetime, timedelta
+    from sqlalchemy import update
+    from app.models.solicitacao import Solicitacao, SolicitacaoHistorico
+
+    ids = [criar(client, f"Buraco {i}", "Buracos", "Centro") for i in range(10)]
+    client.patch("/api/solicitacoes/bulk-status", json={"ids": ids, "status": StatusEnum.EM_ANDAMENTO})
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.CONCLUIDO})
+
+    historico = client.get(f"/api/solicitacoes/{ids[0]}/historico").json()
+    assert [(h["status_anterior"], h["status"]) for h in historico] == [
+        ("pendente", "em_andamento"),
+        ("em_andamento", "concluido"),
+    ]
+    assert client.get("/api/solicitacoes/999999/historico").status_code == 404
+
+    # Solicitação i ficou i+1 horas pendente
+    agora = datetime.utcnow()
+    for i, solicitacao_id in enumerate(ids):
+        await db.execute(update(Solicitacao).where(Solicitacao.id == solicitacao_id).values(criado_em=agora))
+        await db.execute(
+            update(SolicitacaoHistorico)
+            .where(SolicitacaoHistorico.solicitacao_id == solicitacao_id, SolicitacaoHistorico.status_anterior == StatusEnum.PENDENTE)
+            .values(alterado_em=agora + timedelta(hours=i + 1))
+        )
+    await db.execute(
+        update(SolicitacaoHistorico)
+        .where(SolicitacaoHistorico.solicitacao_id == ids[0], SolicitacaoHistorico.status == StatusEnum.CONCLUIDO)
+        .values(alterado_em=agora + timedelta(hours=3))
+    )
+    await db.commit()
+
+    data = client.get("/api/estatisticas/tempo-em-status").json()
+    pendente = next(t for t in data["por_categoria"] if t["status"] == "pendente")
+    assert pendente == {
+        "valor": "Buracos", "status": "pendente", "amostras": 10, "p50_horas": 5.0, "p90_horas": 9.0, "p99_horas": 10.0,
+    }
+    andamento = next(t for t in data["por_bairro"] if t["status"] == "em_andamento")
+    assert andamento["amostras"] == 1
+    assert andamento["p50_horas"] == andamento["p99_horas"] == 2.0
+
+    # Uma nova transição aparece na próxima leitura, sem esperar o cache expirar
+    client.patch(f"/api/solicitacoes/{ids[1]}", json={"status": StatusEnum.CONCLUIDO})
+    data = client.get("/api/estatisticas/tempo-em-status").json()
+    assert next(t for t in data["por_bairro"] if t["status"] == "em_andamento")["amostras"] == 2
@@ -0,0 +1,189 @@
+import math
+import random
+import pytest
+from sqlalchemy import select
+
+from app.core.geo import (
+    bbox_around,
+    covering_cells,
+    encode_geohash,
+    geohash_ranges,
+    haversine_m,
+)
+
+CENTRO = (-22.9035, -43.2096)
+
+
+def deslocar(lat, lon, norte_m, leste_m):
+    """Ponto a norte_m/leste_m metros de (lat, lon)"""
+    dlat = math.degrees(norte_m / 6_371_008.8)
+    dlon = math.degrees(leste_m / (6_371_008.8 * math.cos(math.radians(lat))))
+    return lat + dlat, lon + dlon
+
+def test_encode_geohash():
+    assert encode_geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert encode_geohash(*CENTRO, 5) == "75cm8"
+
+def test_geohash_ranges_cover_bounding_box():
+    rng = random.Random(7)
+    for raio in (50, 500, 5_000, 20_000):
+        bbox = bbox_around(*CENTRO, raio)
+        ranges = geohash_ranges(covering_cells(bbox, max_cells=32))
+        assert len(ranges) <= 32
+        for _ in range(500):
+            lat = rng.uniform(bbox.min_lat, bbox.max_lat)
+            lon = rng.uniform(bbox.min_lon, bbox.max_lon)
+            geohash = encode_geohash(lat, lon)
+            assert any(start <= geohash < end for start, end in ranges)
+
+def test_proximas_returns_points_within_radius_sorted(client):
+    distancias = {"200 m": (200, 0), "700 m": (0, -700), "1,5 km": (-1_500, 0), "900 m": (600, 600)}
+    itens = [
+        {"titulo": f"Ponto {nome}", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro",
+         "latitude": ponto[0], "longitude": ponto[1]}
+        for nome, (norte, leste) in distancias.items()
+        for ponto in [deslocar(*CENTRO, norte, leste)]
+    ]
+    itens.append({"titulo": "Sem coordenadas", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro"})
+    client.post("/api/solicitacoes/bulk", json=itens)
+
+    response = client.get("/api/mapa/proximas", params={"latitude": CENTRO[0], "longitude": CENTRO[1], "raio": 1000})
+    assert response.status_code == 200
+    data = response.json()["solicitacoes"]
+    assert [s["titulo"] for s in data] == ["Ponto 200 m", "Ponto 700 m", "Ponto 900 m"]
+    assert data[0]["distancia_m"] == pytest.approx(200, abs=1)
+
+    response = client.get("/api/mapa/proximas", params={
+        "latitude": CENTRO[0], "longitude": CENTRO[1], "raio": 2000, "limit": 1,
+    })
+    assert [s["titulo"] for s in response.json()["solicitacoes"]] == ["Ponto 200 m"]
+
+def test_proximas_with_limit_returns_nearest_points(client):
+    rng = random.Random(3)
+    pontos = [deslocar(*CENTRO, rng.uniform(-2_000, 2_000), rng.uniform(-2_000, 2_000)) for _ in range(60)]
+    itens = [
+        {"titulo": f"Ponto {i}", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro",
+         "latitude": lat, "longitude": lon}
+        for i, (lat, lon) in enumerate(pontos)
+    ]
+    client.post("/api/solicitacoes/bulk", json=itens)
+    esperados = sorted(
+        (d, f"Ponto {i}") for i, (lat, lon) in enumerate(pontos) if (d := haversine_m(*CENTRO, lat, lon)) <= 1_500
+    )[:7]
+
+    response = client.get("/api/mapa/proximas", params={
+        "latitude": CENTRO[0], "longitude": CENTRO[1], "raio": 1_500, "limit": 7,
+    })
+    data = response.json()["solicitacoes"]
+    assert [s["titulo"] for s in data] == [titulo for _, titulo in esperados]
+    assert [s["distancia_m"] for s in data] == pytest.approx([d for d, _ in esperados], abs=0.1)
+
+def test_area_lists_points_in_bounding_box(client):
+    dentro = [deslocar(*CENTRO, 100 * i, 100 * i) for i in range(3)]
+    fora = deslocar(*CENTRO, 5_000, 0)
+    itens = [
+        {"titulo": f"Ponto {i}", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro",
+         "latitude": lat, "longitude": lon}
+        for i, (lat, lon) in enumerate([*dentro, fora])
+    ]
+    client.post("/api/solicitacoes/bulk", json=itens)
+    bbox = bbox_around(*CENTRO, 1_000)
+    params = {"min_lat": bbox.min_lat, "min_lon": bbox.min_lon, "max_lat": bbox.max_lat, "max_lon": bbox.max_lon}
+
+    data = client.get("/api/mapa/area", params=params).json()
+    assert sorted(s["titulo"] for s in data["solicitacoes"]) == ["Ponto 0", "Ponto 1", "Ponto 2"]
+    assert data["truncado"] is False
+
+    data = client.get("/api/mapa/area", params={**params, "limit": 2}).json()
+    assert len(data["solicitacoes"]) == 2
+    assert data["truncado"] is True
+
+    invertido = {**params, "min_lat": bbox.max_lat, "max_lat": bbox.min_lat}
+    assert client.get("/api/mapa/area", params=invertido).status_code == 400
+
+@pytest.mark.asyncio
+async def test_geo_queries_use_geohash_index(db):
+    from sqlalchemy.dialects import sqlite
+    from app.models.solicitacao import Solicitacao
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    query = SolicitacaoRepository._within_bbox(select(Solicitacao), bbox_around(*CENTRO, 1_000))
+    sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+    conn = await db.connection()
+    plan = " ".join(row[-1] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    assert "ix_solicitacoes_geohash" in plan
+    assert "SCAN solicitacoes" not in plan
+
+def test_haversine():
+    assert haversine_m(*CENTRO, *deslocar(*CENTRO, 1_000, 0)) == pytest.approx(1_000, rel=1e-6)
+
+def criar_pontos(client, pontos):
+    itens = [
+        {"titulo": f"Ponto {i}", "descricao": "Teste", "categoria": "Limpeza", "bairro": "Centro",
+         "latitude": lat, "longitude": lon}
+        for i, (lat, lon) in enumerate(pontos)
+    ]
+    return client.post("/api/solicitacoes/bulk", json=itens).json()["solicitacoes"]
+
+def bbox_params(raio):
+    bbox = bbox_around(*CENTRO, raio)
+    return {"min_lat": bbox.min_lat, "min_lon": bbox.min_lon, "max_lat": bbox.max_lat, "max_lon": bbox.max_lon}
+
+def test_precisions_for_zoom(monkeypatch):
+    from app.core.config import settings
+    from app.core.geo import cell_count
+    from app.services.cluster_service import precisions_for_zoom
+
+    bbox = bbox_around(*CENTRO, 5_000)
+    anteriores = (0, 0)
+    for zoom in range(0, 23):
+        tile, cluster = precisions_for_zoom(bbox, zoom)
+        assert cluster == tile + 1
+        assert (tile, cluster) >= anteriores
+        assert cell_count(bbox, tile) <= settings.MAP_MAX_TILES or tile == 1
+        anteriores = (tile, cluster)
+
+    monkeypatch.setattr(settings, "MAP_MAX_TILES", 4)
+    tile, _ = precisions_for_zoom(bbox, 22)
+    assert cell_count(bbox, tile) <= 4
+
+def test_clusters_aggregate_counts_centroid_and_status(client):
+    perto = [deslocar(*CENTRO, 10, 10), deslocar(*CENTRO, -10, -10), deslocar(*CENTRO, 0, 0)]
+    longe = [deslocar(*CENTRO, 3_000, 3_000)]
+    criadas = criar_pontos(client, perto + longe)
+    client.patch(f"/api/solicitacoes/{criadas[0]['id']}", json={"status": "concluido"})
+
+    response = client.get("/api/mapa/clusters", params={**bbox_params(5_000), "zoom": 13})
+    assert response.status_code == 200
+    data = response.json()
+    clusters = sorted(data["clusters"], key=lambda c: -c["total"])
+    assert [c["total"] for c in clusters] == [3, 1]
+    assert clusters[0]["status"] == {"pendente": 2, "em_andamento": 0, "concluido": 1}
+    assert clusters[0]["latitude"] == pytest.approx(CENTRO[0], abs=1e-4)
+    assert clusters[0]["longitude"] == pytest.approx(CENTRO[1], abs=1e-4)
+    assert all(len(c["geohash"]) == data["precisao"] for c in clusters)
+
+def test_clusters_are_cached_per_tile_and_invalidated_incrementally(client, monkeypatch):
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    criar_pontos(client, [deslocar(*CENTRO, 0, 0), deslocar(*CENTRO, 30_000, 30_000)])
+    calculados = []
+    original = SolicitacaoRepository.cluster_counts
+    async def counting(db, tile, precision):
+        calculados.append(tile)
+        return await original(db, tile, precision)
+    monkeypatch.setattr(SolicitacaoRepository, "cluster_counts", counting)
+    params = {**bbox_params(40_000), "zoom": 9}
+
+    primeira = client.get("/api/mapa/clusters", params=params).json()
+    tiles = len(calculados)
+    assert tiles > 1
+    assert client.get("/api/mapa/clusters", params=params).json() == primeira
+    assert len(calculados) == tiles
+
+    calculados.clear()
+    criar_pontos(client, [deslocar(*CENTRO, 5, 5)])
+    segunda = client.get("/api/mapa/clusters", params=params).json()
+    # Só o tile que contém o novo ponto é recalculado
+    assert len(calculados) == 1
+    assert sum(c["total"] for c in segunda["clusters"]) == 3
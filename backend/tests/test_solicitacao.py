@@ -1,5 +1,14 @@
+import asyncio
+import csv
+import io
 import json
+import os
+import tracemalloc
+import pytest
+from sqlalchemy import select
+
 from app.models.solicitacao import StatusEnum
+from app.schemas.solicitacao import SolicitacaoFiltros
 
 def test_create_solicitacao(client):
     solicitacao_data = {
@@ -72,3 +81,491 @@ def test_update_solicitacao_status(client):
     data = response.json()
     assert data["id"] == solicitacao_id
     assert data["status"] == StatusEnum.EM_ANDAMENTO
+
+def test_update_status_with_if_match(client):
+    solicitacao_id = client.post("/api/solicitacoes/", json={
+        "titulo": "Concorrência", "descricao": "Descrição de teste", "categoria": "Teste", "bairro": "Centro",
+    }).json()["id"]
+    assert client.get(f"/api/solicitacoes/{solicitacao_id}").json()["versao"] == 1
+
+    response = client.patch(
+        f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.EM_ANDAMENTO}, headers={"If-Match": '"1"'}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    assert response.json()["versao"] == 2
+
+    # Segundo operador ainda com a versão 1: a alteração não é aplicada
+    response = client.patch(
+        f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.CONCLUIDO}, headers={"If-Match": '"1"'}
+    )
+    assert response.status_code == 412
+    assert client.get(f"/api/solicitacoes/{solicitacao_id}").json()["status"] == StatusEnum.EM_ANDAMENTO
+
+    for if_match in ('W/"2"', "abc"):
+        response = client.patch(
+            f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.CONCLUIDO}, headers={"If-Match": if_match}
+        )
+        assert response.status_code == 412
+
+    response = client.patch(
+        f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.CONCLUIDO}, headers={"If-Match": "*"}
+    )
+    assert response.headers["ETag"] == '"3"'
+    response = client.patch("/api/solicitacoes/999999", json={"status": StatusEnum.CONCLUIDO}, headers={"If-Match": '"1"'})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_update_status_issues_no_select(client, db):
+    from sqlalchemy import event
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+    from app.schemas.solicitacao import SolicitacaoUpdate
+
+    solicitacao_id = client.post("/api/solicitacoes/", json={
+        "titulo": "Round trips", "descricao": "Descrição de teste", "categoria": "Teste", "bairro": "Centro",
+    }).json()["id"]
+
+    statements = []
+    engine = db.bind.sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        atualizada = await SolicitacaoRepository.update_status(
+            db, solicitacao_id, SolicitacaoUpdate(status=StatusEnum.PENDENTE), versao=1
+        )
+        assert statements == ["UPDATE"]
+        assert atualizada.versao == 2
+
+        statements.clear()
+        atualizada = await SolicitacaoRepository.update_status(
+            db, solicitacao_id, SolicitacaoUpdate(status=StatusEnum.CONCLUIDO), versao=2
+        )
+        assert "SELECT" not in statements
+        assert atualizada.status == StatusEnum.CONCLUIDO and atualizada.concluido_em is not None
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+def test_conditional_get_returns_304(client, monkeypatch):
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    solicitacao_id = client.post("/api/solicitacoes/", json={
+        "titulo": "Validadores", "descricao": "Descrição de teste", "categoria": "Teste", "bairro": "Centro",
+    }).json()["id"]
+    response = client.get(f"/api/solicitacoes/{solicitacao_id}")
+    assert response.headers["ETag"] == '"1"'
+    assert response.headers["Cache-Control"] == "no-cache"
+    last_modified = response.headers["Last-Modified"]
+
+    calls = {"get_by_id": 0}
+    original = SolicitacaoRepository.get_by_id
+
+    async def counting(*args, **kwargs):
+        calls["get_by_id"] += 1
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(SolicitacaoRepository, "get_by_id", staticmethod(counting))
+    for headers in ({"If-None-Match": '"1"'}, {"If-None-Match": 'W/"1", "7"'}, {"If-Modified-Since": last_modified}):
+        response = client.get(f"/api/solicitacoes/{solicitacao_id}", headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == '"1"'
+    assert calls["get_by_id"] == 0
+
+    client.patch(f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.EM_ANDAMENTO})
+    response = client.get(f"/api/solicitacoes/{solicitacao_id}", headers={"If-None-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    listing = client.get("/api/solicitacoes/")
+    etag = listing.headers["ETag"]
+    assert client.get("/api/solicitacoes/", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/api/solicitacoes/", json={
+        "titulo": "Nova", "descricao": "Descrição de teste", "categoria": "Teste", "bairro": "Centro",
+    })
+    response = client.get("/api/solicitacoes/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+@pytest.mark.asyncio
+async def test_fotos_are_loaded_in_batches(client, db):
+    from sqlalchemy import event
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    base = {"descricao": "Descrição de teste", "categoria": "Teste", "bairro": "Centro"}
+    sem_fotos = client.post("/api/solicitacoes/", json={**base, "titulo": "Sem fotos"}).json()
+    assert sem_fotos["fotos_url"] is None
+    com_fotos = client.post("/api/solicitacoes/", json={**base, "titulo": "Com fotos", "fotos_url": ["1.jpg", "2.jpg"]})
+    solicitacao_id = com_fotos.json()["id"]
+    assert com_fotos.json()["fotos_url"] == ["1.jpg", "2.jpg"]
+
+    response = client.patch(f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.EM_ANDAMENTO})
+    assert response.json()["fotos_url"] == ["1.jpg", "2.jpg"]
+    assert client.get(f"/api/solicitacoes/{solicitacao_id}").json()["fotos_url"] == ["1.jpg", "2.jpg"]
+
+    titulos = lambda params: [s["titulo"] for s in client.get("/api/solicitacoes/", params=params).json()["solicitacoes"]]
+    assert titulos({"com_fotos": "true"}) == ["Com fotos"]
+    assert titulos({"com_fotos": "false"}) == ["Sem fotos"]
+
+    statements = []
+    engine = db.bind.sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        pagina = await SolicitacaoRepository.list_after(db, limit=10, filtros=SolicitacaoFiltros(com_fotos=False))
+        assert [s.fotos for s in pagina] == [[]]
+        assert len(statements) == 1
+
+        statements.clear()
+        pagina = await SolicitacaoRepository.list_after(db, limit=10)
+        assert [[f.url for f in s.fotos] for s in pagina] == [["1.jpg", "2.jpg"], []]
+        assert len(statements) == 2
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+def test_list_solicitacoes_cursor_pagination(client):
+    for i in range(5):
+        client.post("/api/solicitacoes/", json={
+            "titulo": f"Paginação {i}",
+            "descricao": "Descrição de teste",
+            "categoria": "Teste",
+            "bairro": "Centro",
+        })
+
+    first_page = client.get("/api/solicitacoes/?limit=2").json()
+    assert len(first_page["solicitacoes"]) == 2
+    assert first_page["next_cursor"]
+
+    seen = [s["id"] for s in first_page["solicitacoes"]]
+    cursor = first_page["next_cursor"]
+    while cursor:
+        page = client.get(f"/api/solicitacoes/?limit=2&cursor={cursor}").json()
+        seen.extend(s["id"] for s in page["solicitacoes"])
+        cursor = page["next_cursor"]
+
+    offset_ids = [s["id"] for s in client.get("/api/solicitacoes/?limit=100").json()["solicitacoes"]]
+    assert seen == offset_ids
+    assert len(set(seen)) == 5
+
+def test_list_solicitacoes_sparse_fields(client):
+    base = {"descricao": "Descrição longa " * 50, "categoria": "Teste", "bairro": "Centro"}
+    for i in range(3):
+        client.post("/api/solicitacoes/", json={**base, "titulo": f"Campos {i}", "fotos_url": [f"{i}.jpg"] if i else None})
+
+    completa = client.get("/api/solicitacoes/?limit=2")
+    resumo = client.get("/api/solicitacoes/?limit=2&visao=resumo")
+    assert resumo.status_code == 200
+    assert len(resumo.content) < len(completa.content) / 2
+    assert set(resumo.json()["solicitacoes"][0]) == {
+        "id", "titulo", "categoria", "bairro", "status", "criado_em", "latitude", "longitude"
+    }
+    assert resumo.json()["next_cursor"] == completa.json()["next_cursor"]
+    assert resumo.json()["total"] == completa.json()["total"]
+
+    esparsa = client.get("/api/solicitacoes/?fields=fotos_url, titulo,id").json()["solicitacoes"]
+    assert esparsa == [
+        {"id": s["id"], "titulo": s["titulo"], "fotos_url": s["fotos_url"]}
+        for s in client.get("/api/solicitacoes/").json()["solicitacoes"]
+    ]
+    assert [list(s) for s in esparsa][0] == ["id", "titulo", "fotos_url"]
+    assert [s["fotos_url"] for s in esparsa] == [["2.jpg"], ["1.jpg"], None]
+
+    cursor = client.get("/api/solicitacoes/?limit=2&fields=id").json()["next_cursor"]
+    assert client.get(f"/api/solicitacoes/?limit=2&fields=id&cursor={cursor}").json()["solicitacoes"] == [
+        {"id": esparsa[2]["id"]}
+    ]
+
+    response = client.get("/api/solicitacoes/?fields=id,senha")
+    assert response.status_code == 400
+    assert "senha" in response.json()["detail"]
+
+def test_list_solicitacoes_invalid_cursor(client):
+    response = client.get("/api/solicitacoes/?cursor=nao-e-um-cursor")
+    assert response.status_code == 400
+
+def test_list_solicitacoes_filters(client):
+    base = {"descricao": "Descrição de teste", "categoria": "Iluminação", "bairro": "Tijuca"}
+    client.post("/api/solicitacoes/", json={**base, "titulo": "Poste apagado"})
+    client.post("/api/solicitacoes/", json={**base, "titulo": "Poste piscando", "bairro": "Centro"})
+    other = client.post("/api/solicitacoes/", json={**base, "titulo": "Buraco", "categoria": "Pavimentação"}).json()
+    client.patch(f"/api/solicitacoes/{other['id']}", json={"status": StatusEnum.EM_ANDAMENTO})
+
+    data = client.get("/api/solicitacoes/?categoria=Iluminação&bairro=Tijuca").json()
+    assert data["total"] == 1
+    assert [s["titulo"] for s in data["solicitacoes"]] == ["Poste apagado"]
+
+    data = client.get("/api/solicitacoes/?bairro=Tijuca&categoria=Iluminação&status=em_andamento").json()
+    assert data["total"] == 0
+
+    data = client.get("/api/solicitacoes/?status=em_andamento").json()
+    assert [s["id"] for s in data["solicitacoes"]] == [other["id"]]
+
+    data = client.get("/api/solicitacoes/?criado_ate=2000-01-01T00:00:00Z").json()
+    assert data["total"] == 0
+    data = client.get("/api/solicitacoes/?criado_de=2000-01-01T00:00:00Z&categoria=Iluminação").json()
+    assert data["total"] == 2
+
+@pytest.mark.asyncio
+async def test_list_solicitacoes_filters_use_indexes(db):
+    from sqlalchemy.dialects import sqlite
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+    from app.models.solicitacao import Solicitacao
+    from app.schemas.solicitacao import SolicitacaoFiltros
+
+    for filtros in (
+        SolicitacaoFiltros(status=StatusEnum.PENDENTE),
+        SolicitacaoFiltros(categoria="Iluminação"),
+        SolicitacaoFiltros(bairro="Centro"),
+    ):
+        query = SolicitacaoRepository._apply_filters(select(Solicitacao), filtros)
+        query = query.order_by(Solicitacao.criado_em.desc(), Solicitacao.id.desc()).limit(100)
+        sql = str(query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+        conn = await db.connection()
+        plan = " ".join(row[-1] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+        assert "USING INDEX ix_solicitacoes_" in plan
+        assert "TEMP B-TREE" not in plan
+
+def test_list_solicitacoes_total_modes(client):
+    base = {"descricao": "Descrição de teste", "categoria": "Limpeza", "bairro": "Lapa"}
+    ids = [client.post("/api/solicitacoes/", json={**base, "titulo": f"Lixo {i}"}).json()["id"] for i in range(3)]
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.CONCLUIDO})
+
+    assert client.get("/api/solicitacoes/").json()["total"] == 3
+    assert client.get("/api/solicitacoes/?status=pendente").json()["total"] == 2
+    assert client.get("/api/solicitacoes/?status=concluido&total=estimate").json()["total"] == 1
+    assert client.get("/api/solicitacoes/?bairro=Lapa&total=estimate").json()["total"] == 3
+    assert client.get("/api/solicitacoes/?total=none").json()["total"] is None
+
+@pytest.mark.asyncio
+async def test_rebuild_counters_matches_maintained_counters(client, db):
+    from app.models.solicitacao import SolicitacaoContador
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    base = {"descricao": "Descrição de teste", "categoria": "Limpeza", "bairro": "Lapa"}
+    ids = [client.post("/api/solicitacoes/", json={**base, "titulo": f"Lixo {i}"}).json()["id"] for i in range(4)]
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.EM_ANDAMENTO})
+    client.patch(f"/api/solicitacoes/{ids[0]}", json={"status": StatusEnum.CONCLUIDO})
+    client.patch(f"/api/solicitacoes/{ids[1]}", json={"status": StatusEnum.EM_ANDAMENTO})
+
+    maintained = {c.status: c.total for c in (await db.scalars(select(SolicitacaoContador))).all()}
+    await SolicitacaoRepository.rebuild_counters(db)
+    db.expire_all()
+    rebuilt = {c.status: c.total for c in (await db.scalars(select(SolicitacaoContador))).all()}
+    assert maintained == rebuilt == {
+        StatusEnum.PENDENTE: 2,
+        StatusEnum.EM_ANDAMENTO: 1,
+        StatusEnum.CONCLUIDO: 1,
+    }
+
+def test_cache_hits_across_requests(client, monkeypatch):
+    from app.repositories.solicitacao_repository import SolicitacaoRepository
+
+    calls = {"get_by_id": 0, "list_all": 0}
+    for name in calls:
+        original = getattr(SolicitacaoRepository, name)
+
+        async def counting(*args, _original=original, _name=name, **kwargs):
+            calls[_name] += 1
+            return await _original(*args, **kwargs)
+
+        monkeypatch.setattr(SolicitacaoRepository, name, staticmethod(counting))
+
+    solicitacao_id = client.post("/api/solicitacoes/", json={
+        "titulo": "Teste de cache",
+        "descricao": "Descrição de teste",
+        "categoria": "Teste",
+        "bairro": "Centro",
+    }).json()["id"]
+
+    for _ in range(10):
+        assert client.get(f"/api/solicitacoes/{solicitacao_id}").status_code == 200
+        assert client.get("/api/solicitacoes/?limit=10&bairro=Centro").status_code == 200
+    assert calls == {"get_by_id": 1, "list_all": 1}
+
+    client.patch(f"/api/solicitacoes/{solicitacao_id}", json={"status": StatusEnum.CONCLUIDO})
+    assert client.get(f"/api/solicitacoes/{solicitacao_id}").json()["status"] == StatusEnum.CONCLUIDO
+    listed = client.get("/api/solicitacoes/?limit=10&bairro=Centro").json()["solicitacoes"]
+    assert listed[0]["status"] == StatusEnum.CONCLUIDO
+
+@pytest.mark.asyncio
+async def test_thundering_herd_runs_list_queries_once(session_factory, monkeypatch):
+    from sqlalchemy import event
+    from app.core import cache
+    from app.services.solicitacao_service import SolicitacaoService, LIST_CACHE_NAMESPACE
+    from app.schemas.solicitacao import SolicitacaoCreate
+
+    monkeypatch.setattr(cache, "redis_client", None)
+    async with session_factory() as db:
+        for i in range(5):
+            await SolicitacaoService.create_solicitacao(db, SolicitacaoCreate(
+                titulo=f"Concorrência {i}", descricao="Descrição", categoria="Teste", bairro="Centro",
+            ))
+    await cache.invalidate_namespace(LIST_CACHE_NAMESPACE)
+
+    statements = []
+    sync_engine = session_factory.kw["bind"].sync_engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    sessions = [session_factory() for _ in range(50)]
+    try:
+        results = await asyncio.gather(*(
+            SolicitacaoService.list_solicitacoes(session, limit=10, filtros=SolicitacaoFiltros(bairro="Centro"))
+            for session in sessions
+        ))
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+        for session in sessions:
+            await session.close()
+
+    assert all(json.loads(r.body)["total"] == 5 for r in results)
+    # Uma consulta de página + uma de contagem para 50 requisições simultâneas
+    assert len(statements) == 2
+
+def test_bulk_create_reports_invalid_items(client):
+    assert client.get("/api/solicitacoes/").json()["total"] == 0
+    itens = [
+        {"titulo": "Lote 1", "descricao": "Primeiro", "categoria": "Limpeza", "bairro": "Centro"},
+        {"titulo": "X", "descricao": "Título curto", "categoria": "Limpeza"},
+        {"titulo": "Lote 3", "descricao": "Terceiro", "categoria": "Limpeza", "bairro": "Lapa", "fotos_url": ["a.jpg"]},
+    ]
+
+    response = client.post("/api/solicitacoes/bulk", json=itens)
+    assert response.status_code == 201
+    data = response.json()
+    assert [s["titulo"] for s in data["solicitacoes"]] == ["Lote 1", "Lote 3"]
+    assert data["solicitacoes"][1]["fotos_url"] == ["a.jpg"]
+    assert [e["indice"] for e in data["erros"]] == [1]
+    assert {tuple(d["loc"]) for d in data["erros"][0]["detalhes"]} == {("titulo",), ("bairro",)}
+
+    # O lote invalida as listagens em cache uma única vez
+    assert client.get("/api/solicitacoes/").json()["total"] == 2
+    assert client.get("/api/solicitacoes/?status=pendente").json()["total"] == 2
+
+def test_bulk_update_status(client):
+    itens = [
+        {"titulo": f"Lote {i}", "descricao": "Descrição", "categoria": "Limpeza", "bairro": "Centro"}
+        for i in range(3)
+    ]
+    ids = [s["id"] for s in client.post("/api/solicitacoes/bulk", json=itens).json()["solicitacoes"]]
+    assert client.get(f"/api/solicitacoes/{ids[0]}").json()["status"] == "pendente"
+
+    response = client.patch(
+        "/api/solicitacoes/bulk-status", json={"ids": [ids[0], 9999, ids[1], ids[0]], "status": "concluido"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["id"] for s in data["solicitacoes"]] == ids[:2]
+    assert all(s["status"] == "concluido" for s in data["solicitacoes"])
+    assert [(e["indice"], e["id"]) for e in data["erros"]] == [(1, 9999)]
+
+    assert client.get(f"/api/solicitacoes/{ids[0]}").json()["status"] == "concluido"
+    assert client.get("/api/solicitacoes/?status=concluido").json()["total"] == 2
+    assert client.get("/api/solicitacoes/?status=pendente").json()["total"] == 1
+
+def test_bulk_rejects_oversized_batches(client, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    response = client.patch("/api/solicitacoes/bulk-status", json={"ids": [1, 2, 3], "status": "concluido"})
+    assert response.status_code == 413
+
+def test_export_ndjson_and_csv_use_list_filters(client):
+    itens = [
+        {"titulo": "Exportar 1", "descricao": "Com \"aspas\", vírgula", "categoria": "Limpeza", "bairro": "Centro",
+         "fotos_url": ["a.jpg", "b.jpg"]},
+        {"titulo": "Exportar 2", "descricao": "Outro bairro", "categoria": "Limpeza", "bairro": "Lapa"},
+    ]
+    client.post("/api/solicitacoes/bulk", json=itens)
+
+    response = client.get("/api/solicitacoes/export?bairro=Centro")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    linhas = [json.loads(linha) for linha in response.text.splitlines()]
+    assert [l["titulo"] for l in linhas] == ["Exportar 1"]
+    assert linhas[0]["fotos_url"] == ["a.jpg", "b.jpg"]
+    assert linhas[0]["status"] == "pendente"
+
+    response = client.get("/api/solicitacoes/export?formato=csv")
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert 'filename="solicitacoes.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["titulo"] for r in rows] == ["Exportar 2", "Exportar 1"]
+    assert rows[1]["descricao"] == "Com \"aspas\", vírgula"
+    assert rows[1]["fotos_url"] == "a.jpg b.jpg"
+
+@pytest.mark.asyncio
+async def test_export_memory_is_bounded(session_factory, monkeypatch):
+    # EXPORT_TEST_ROWS=1000000 reproduz a exportação completa; o padrão mantém a suíte rápida
+    from datetime import datetime, timedelta
+    from sqlalchemy import create_engine, insert
+    from app.core.config import settings
+    from app.models.solicitacao import Solicitacao
+    from app.schemas.solicitacao import ExportFormato
+    from app.services.solicitacao_service import SolicitacaoService
+
+    rows = int(os.getenv("EXPORT_TEST_ROWS", "20000"))
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 500)
+    url = session_factory.kw["bind"].url.set(drivername="sqlite")
+    sync_engine = create_engine(url)
+    inicio = datetime(2024, 1, 1)
+    with sync_engine.begin() as conn:
+        for offset in range(0, rows, 10_000):
+            conn.execute(insert(Solicitacao), [
+                {"titulo": f"Carga {i}", "descricao": "Descrição da carga " * 5, "categoria": "Limpeza",
+                 "bairro": "Centro", "status": StatusEnum.PENDENTE, "criado_em": inicio + timedelta(seconds=i),
+                 "atualizado_em": inicio}
+                for i in range(offset, min(offset + 10_000, rows))
+            ])
+    sync_engine.dispose()
+
+    exported = 0
+    tracemalloc.start()
+    try:
+        async with session_factory() as db:
+            async for chunk in SolicitacaoService.export_solicitacoes(db, ExportFormato.NDJSON):
+                exported += chunk.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert exported == rows
+    # Um lote de 500 linhas ocupa poucas centenas de KB; o teto não depende do total de linhas
+    assert peak < 8 * 1024 * 1024
+
+def test_search_ranks_and_paginates(client):
+    itens = [
+        {"titulo": "Buraco na rua principal", "descricao": "Buraco enorme na rua, perigo", "categoria": "Pavimentação", "bairro": "Centro"},
+        {"titulo": "Poste apagado", "descricao": "Há um buraco perto do poste na rua", "categoria": "Iluminação", "bairro": "Centro"},
+        {"titulo": "Vazamento de água", "descricao": "Água limpa descendo a rua", "categoria": "Saneamento", "bairro": "Lapa"},
+        {"titulo": "Buraco na calçada", "descricao": "Calçada quebrada", "categoria": "Pavimentação", "bairro": "Lapa"},
+    ]
+    client.post("/api/solicitacoes/bulk", json=itens)
+
+    data = client.get("/api/solicitacoes/busca", params={"q": "buraco rua"}).json()
+    titulos = [s["titulo"] for s in data["solicitacoes"]]
+    assert titulos == ["Buraco na rua principal", "Poste apagado"]
+    assert data["solicitacoes"][0]["relevancia"] > data["solicitacoes"][1]["relevancia"]
+
+    # Sem acento também encontra
+    assert [s["titulo"] for s in client.get("/api/solicitacoes/busca?q=agua").json()["solicitacoes"]] == ["Vazamento de água"]
+    assert [s["titulo"] for s in client.get("/api/solicitacoes/busca?q=buraco&bairro=Lapa").json()["solicitacoes"]] == ["Buraco na calçada"]
+
+    paginados, cursor = [], None
+    while True:
+        params = {"q": "buraco", "limit": 1, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/solicitacoes/busca", params=params).json()
+        paginados += [s["titulo"] for s in page["solicitacoes"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    completo = [s["titulo"] for s in client.get("/api/solicitacoes/busca?q=buraco").json()["solicitacoes"]]
+    assert paginados == completo
+    assert len(completo) == 3
+
+    assert client.get("/api/solicitacoes/busca?q=buraco&cursor=invalido").status_code == 400
+
+def test_search_index_is_updated_on_create(client):
+    assert client.get("/api/solicitacoes/busca?q=semáforo").json()["solicitacoes"] == []
+    client.post("/api/solicitacoes/", json={
+        "titulo": "Semáforo quebrado", "descricao": "Cruzamento sem sinal", "categoria": "Sinalização", "bairro": "Tijuca",
+    })
+    assert [s["titulo"] for s in client.get("/api/solicitacoes/busca?q=semaforo").json()["solicitacoes"]] == ["Semáforo quebrado"]
@@ -30,6 +30,7 @@ export interface Solicitacao {
 export interface SolicitacaoListResponse {
   solicitacoes: Solicitacao[];
   total: number;
+  next_cursor?: string | null;
 }
 
 export interface SolicitacaoCreateData {